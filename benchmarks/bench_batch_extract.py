@@ -0,0 +1,101 @@
+"""Compare one /extract request per label with the /extract/batch endpoint.
+
+The labels are sent to the backend with a local fake Ollama server, first as one
+request after another, then as a single batch, then as a streamed batch where the
+time to the first result is also reported. Every text is distinct, so each one
+needs a model call, and the batch should finish close to labels / parallel times
+the model latency.
+
+Usage:
+    python benchmarks/bench_batch_extract.py [--labels 40] [--parallel 4] [--latency 0.1]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from common import BACKEND_SRC, Timer, add_service_to_path
+from fake_services import BackgroundServer, create_fake_ollama
+
+
+async def send_one_by_one(client: httpx.AsyncClient, texts: list[str]) -> None:
+    """Send a request per label, one after another."""
+    for text in texts:
+        response = await client.post("/extract", json={"ocr_text": text})
+        response.raise_for_status()
+
+
+async def send_batch(client: httpx.AsyncClient, texts: list[str]) -> None:
+    """Send the labels as one batch and check the results are in order."""
+    response = await client.post("/extract/batch", json={"ocr_texts": texts})
+    response.raise_for_status()
+    items = response.json()
+    assert [item["index"] for item in items] == list(range(len(texts)))
+    assert not any(item["error"] for item in items)
+
+
+async def stream_batch(client: httpx.AsyncClient, texts: list[str]) -> float:
+    """Stream the batch results, returning the seconds to the first result."""
+    start = time.perf_counter()
+    first = None
+    indexes = []
+    async with client.stream(
+        "POST", "/extract/batch", json={"ocr_texts": texts, "stream": True}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            if first is None:
+                first = time.perf_counter() - start
+            indexes.append(json.loads(line)["index"])
+    assert indexes == list(range(len(texts)))
+    return first or 0.0
+
+
+async def main_async(backend_url: str, labels: int) -> None:
+    async with httpx.AsyncClient(base_url=backend_url, timeout=None) as client:
+        # Each round uses its own texts so the response cache does not answer them.
+        rounds = [
+            [f"Label {round_name} {index}" for index in range(labels)]
+            for round_name in ("single", "batch", "stream")
+        ]
+        with Timer() as timer:
+            await send_one_by_one(client, rounds[0])
+        print(f"one request per label: {timer.elapsed:.2f} s")
+        with Timer() as timer:
+            await send_batch(client, rounds[1])
+        print(f"batch:                 {timer.elapsed:.2f} s")
+        with Timer() as timer:
+            first = await stream_batch(client, rounds[2])
+        print(
+            f"streamed batch:        {timer.elapsed:.2f} s, first result {first:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", type=int, default=40)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    fake_ollama = create_fake_ollama(latency=args.latency)
+    with BackgroundServer(fake_ollama) as server:
+        os.environ["OLLAMA_URL"] = f"{server.url}/api/chat"
+        os.environ["OLLAMA_NUM_PARALLEL"] = str(args.parallel)
+        # The keyword rules would answer the fake labels without the model.
+        os.environ["FORCE_LLM"] = "1"
+        add_service_to_path(BACKEND_SRC)
+        import main
+
+        # Served over a socket, as the in-process transport buffers the stream.
+        with BackgroundServer(main.app) as backend:
+            asyncio.run(main_async(backend.url, args.labels))
+
+    print(f"Max chat calls in flight: {fake_ollama.state.max_in_flight}")
+    print(f"Scheduler: {main.ollama_scheduler.stats}")
+    assert fake_ollama.state.max_in_flight <= args.parallel
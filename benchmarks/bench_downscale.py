@@ -0,0 +1,75 @@
+"""Compare latency and OCR output of the full resolution and downscaled pipelines.
+
+The downscaled text is compared with the full resolution text, and both are
+compared with the text recorded in test_images.txt, using difflib similarity.
+
+Usage:
+    python benchmarks/bench_downscale.py [--max-long-side 2000 1500 1000]
+"""
+
+import argparse
+import difflib
+import statistics
+import time
+
+from common import FRONTEND_SRC, TEST_IMAGES, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor.image_processor import process_image
+from processing_labels.image_processor.image_utils import decode_image
+
+SECTION_SEPARATOR = "-----------------------------------------"
+
+
+def load_recorded_texts() -> dict[str, str]:
+    """Get the recorded OCR text of each test image."""
+    text = (TEST_IMAGES / "test_images.txt").read_text(encoding="utf-8")
+    recorded = {}
+    for section in text.split(SECTION_SEPARATOR):
+        image_name, _, label_text = section.strip().partition("\n")
+        if image_name:
+            recorded[image_name] = label_text
+    return recorded
+
+
+def read_label(image_bytes: bytes, max_long_side: int) -> tuple[str, float]:
+    """Decode and read the label, returning the text and the latency."""
+    start = time.perf_counter()
+    image = decode_image(image_bytes, max_long_side)
+    try:
+        text = "\n".join(process_image(image, max_long_side=max_long_side))
+    except ValueError:
+        text = ""
+    return text, time.perf_counter() - start
+
+
+def similarity(text: str, reference: str) -> float:
+    """Get the difflib similarity of the word sequences."""
+    return difflib.SequenceMatcher(None, text.split(), reference.split()).ratio()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--max-long-side", type=int, nargs="+", default=[2000, 1500, 1000]
+    )
+    args = parser.parse_args()
+    recorded = load_recorded_texts()
+    images = {path.stem: path.read_bytes() for path in test_image_paths()}
+    full = {name: read_label(image, 0) for name, image in images.items()}
+    full_latency = statistics.mean(latency for _, latency in full.values())
+    print(f"full resolution: {full_latency:.2f} s per label")
+    for max_long_side in args.max_long_side:
+        latencies, vs_full, vs_recorded = [], [], []
+        for name, image in images.items():
+            text, latency = read_label(image, max_long_side)
+            latencies.append(latency)
+            vs_full.append(similarity(text, full[name][0]))
+            if name in recorded:
+                vs_recorded.append(similarity(text, recorded[name]))
+        print(
+            f"long side {max_long_side}: {statistics.mean(latencies):.2f} s per label, "
+            f"similarity to full resolution {statistics.mean(vs_full):.2f}, "
+            f"to recorded text {statistics.mean(vs_recorded):.2f}"
+        )
@@ -0,0 +1,60 @@
+"""Compare request throughput of a client per request and a shared pooled client.
+
+The requests go to a local stub of the backend /extract endpoint.
+
+Usage:
+    python benchmarks/bench_http_client.py [--requests 500] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+
+import httpx
+from common import FRONTEND_SRC, Timer, add_service_to_path
+from fake_services import BackgroundServer, create_fake_backend
+
+add_service_to_path(FRONTEND_SRC)
+
+from http_client import create_async_client
+
+
+async def run_requests(
+    url: str, requests: int, concurrency: int, shared: bool
+) -> float:
+    """Send the requests and get the throughput in requests per second."""
+    client = create_async_client("BENCH", timeout=30.0) if shared else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(index: int) -> None:
+        async with semaphore:
+            if client is not None:
+                response = await client.post(url, json={"ocr_text": f"label {index}"})
+            else:
+                async with httpx.AsyncClient() as new_client:
+                    response = await new_client.post(
+                        url, json={"ocr_text": f"label {index}"}, timeout=30.0
+                    )
+            response.raise_for_status()
+
+    with Timer() as timer:
+        await asyncio.gather(*(post(index) for index in range(requests)))
+    if client is not None:
+        await client.aclose()
+    return requests / timer.elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    with BackgroundServer(create_fake_backend()) as server:
+        url = f"{server.url}/extract"
+        per_request = asyncio.run(
+            run_requests(url, args.requests, args.concurrency, shared=False)
+        )
+        shared = asyncio.run(
+            run_requests(url, args.requests, args.concurrency, shared=True)
+        )
+    print(f"Client per request: {per_request:.0f} requests/s")
+    print(f"Shared pooled client: {shared:.0f} requests/s")
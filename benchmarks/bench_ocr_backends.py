@@ -0,0 +1,49 @@
+"""Compare per-label latency of the pytesseract and tesserocr OCR backends.
+
+The tesserocr backend needs the tesserocr package and the eng language data.
+
+Usage:
+    python benchmarks/bench_ocr_backends.py
+"""
+
+import statistics
+import time
+
+import cv2
+from common import FRONTEND_SRC, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor import image_reader
+from processing_labels.image_processor.image_processor import process_image
+
+
+def label_latencies(images: list) -> list[float]:
+    """Get the process_image latency of each label."""
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        try:
+            process_image(image)
+        except ValueError:
+            pass
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    images = [cv2.imread(str(path)) for path in test_image_paths()]
+    for name in ("pytesseract", "tesserocr"):
+        try:
+            image_reader.set_ocr_backend(image_reader.create_ocr_backend(name))
+        except (ImportError, RuntimeError) as e:
+            print(f"{name}: not available ({e})")
+            continue
+        # Warm up so the tesserocr engine load is not counted against the first label.
+        label_latencies(images[:1])
+        latencies = label_latencies(images)
+        print(
+            f"{name}: mean {statistics.mean(latencies):.3f} s, "
+            f"median {statistics.median(latencies):.3f} s, "
+            f"max {max(latencies):.3f} s per label"
+        )
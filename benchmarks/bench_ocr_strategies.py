@@ -0,0 +1,69 @@
+"""Compare the sequential psm fallback with racing the OCR strategies.
+
+Each test image is read in both modes and the latency is reported for all
+labels and for the hard labels where the first strategy fails the quality check.
+
+Usage:
+    python benchmarks/bench_ocr_strategies.py [--strategies psm4 psm1 psm4_adaptive]
+"""
+
+import argparse
+import statistics
+import time
+
+from common import FRONTEND_SRC, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor import image_processor
+from processing_labels.image_processor.image_utils import decode_image
+from processing_labels.image_processor.ocr_strategies import (
+    STRATEGIES,
+    StrategyMode,
+    read_with_strategies,
+    run_strategy,
+)
+
+
+def read_label(image, names: list[str], mode: StrategyMode) -> float:
+    """Read the label and return the latency."""
+    image = image_processor.downscale_to_long_side(
+        image, image_processor.OCR_MAX_LONG_SIDE
+    )
+    thresh = image_processor.preprocessing_pipeline.run(image)
+    cv2_rotation, skew_angle = image_processor.find_orientation(thresh)
+
+    def orient(image):
+        return image_processor.apply_orientation(image, cv2_rotation, skew_angle)
+
+    start = time.perf_counter()
+    try:
+        read_with_strategies(image, orient(thresh), orient, names=names, mode=mode)
+    except ValueError:
+        pass
+    return time.perf_counter() - start
+
+
+def is_hard(image, name: str) -> bool:
+    """Check whether the first strategy fails the quality check."""
+    thresh = image_processor.preprocessing_pipeline.run(image)
+    return not run_strategy(name, image, thresh, lambda image: image).quality["good"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--strategies", nargs="+", default=["psm4", "psm1"], choices=STRATEGIES
+    )
+    args = parser.parse_args()
+    images = [decode_image(path.read_bytes(), 2000) for path in test_image_paths()]
+    hard = [is_hard(image, args.strategies[0]) for image in images]
+    print(f"{sum(hard)} of {len(images)} labels fail the first strategy")
+    for mode in StrategyMode:
+        latencies = [read_label(image, args.strategies, mode) for image in images]
+        hard_latencies = [latency for latency, h in zip(latencies, hard) if h]
+        hard_mean = statistics.mean(hard_latencies) if hard_latencies else 0.0
+        print(
+            f"{mode}: {statistics.mean(latencies):.2f} s per label, "
+            f"{hard_mean:.2f} s per hard label"
+        )
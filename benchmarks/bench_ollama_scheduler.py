@@ -0,0 +1,60 @@
+"""Check the Ollama request scheduler against a local fake Ollama server.
+
+A burst of /extract requests with a handful of distinct labels is sent to the
+backend. The fake server should see one chat call per distinct label and never more
+calls in flight than OLLAMA_NUM_PARALLEL.
+
+Usage:
+    python benchmarks/bench_ollama_scheduler.py [--requests 50] [--labels 10] [--parallel 2]
+"""
+
+import argparse
+import asyncio
+import os
+
+import httpx
+from common import BACKEND_SRC, Timer, add_service_to_path
+from fake_services import BackgroundServer, create_fake_ollama
+
+
+async def send_burst(app, requests: int, labels: int) -> None:
+    """Send all requests to the backend at the same time."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://backend"
+    ) as client:
+        responses = await asyncio.gather(
+            *(
+                client.post("/extract", json={"ocr_text": f"Label {index % labels}"})
+                for index in range(requests)
+            )
+        )
+    for response in responses:
+        response.raise_for_status()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--labels", type=int, default=10)
+    parser.add_argument("--parallel", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake_ollama = create_fake_ollama(latency=args.latency)
+    with BackgroundServer(fake_ollama) as server:
+        os.environ["OLLAMA_URL"] = f"{server.url}/api/chat"
+        os.environ["OLLAMA_NUM_PARALLEL"] = str(args.parallel)
+        add_service_to_path(BACKEND_SRC)
+        import main
+
+        with Timer() as timer:
+            asyncio.run(send_burst(main.app, args.requests, args.labels))
+
+    print(f"Wall time: {timer.elapsed:.2f} s")
+    print(f"Chat calls: {fake_ollama.state.requests} for {args.labels} distinct labels")
+    print(f"Max chat calls in flight: {fake_ollama.state.max_in_flight}")
+    print(f"Scheduler: {main.ollama_scheduler.stats}")
+    print(f"Response cache: {main.response_cache.stats}")
+    assert fake_ollama.state.requests == args.labels
+    assert fake_ollama.state.max_in_flight <= args.parallel
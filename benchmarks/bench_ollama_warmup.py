@@ -0,0 +1,77 @@
+"""Compare the latency of a model call with a cold and a warm Ollama model.
+
+The model is unloaded, then timed for the first call after the unload, for the
+following call with new label text, and for the first call after the start-up
+warm-up. The warm calls reuse the loaded model and the cached system prompt.
+
+Without a URL a local fake Ollama server stands in, with a simulated model load
+and prompt processing time. With a URL a real Ollama server is used, with the
+model named by OLLAMA_MODEL.
+
+Usage:
+    python benchmarks/bench_ollama_warmup.py [--ollama-url http://localhost:11434/api/chat]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from contextlib import nullcontext
+
+from common import BACKEND_SRC, add_service_to_path
+from fake_services import BackgroundServer, create_fake_ollama
+
+
+async def unload_model(main) -> None:
+    """Ask Ollama to unload the model straight away."""
+    body = {"model": main.MODEL_NAME, "messages": [], "keep_alive": 0}
+    response = await main.ollama_client.post(main.OLLAMA_URL, json=body)
+    response.raise_for_status()
+
+
+async def timed_call(main, ocr_text: str) -> float:
+    """Get the latency of one model call."""
+    start = time.perf_counter()
+    await main.invoke_ollama_model(ocr_text)
+    return time.perf_counter() - start
+
+
+async def run(main) -> None:
+    await unload_model(main)
+    cold = await timed_call(main, "Label A\nWatering: keep moist")
+    warm = await timed_call(main, "Label B\nFertilise in spring")
+    await unload_model(main)
+    await main.warm_up_model()
+    after_warm_up = await timed_call(main, "Label C\nWatering: weekly")
+    await main.ollama_client.aclose()
+    print(f"cold model:            {cold:.2f} s")
+    print(f"warm model:            {warm:.2f} s")
+    print(f"after start-up warm-up: {after_warm_up:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ollama-url", default=None)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--load-latency", type=float, default=2.0)
+    parser.add_argument("--prompt-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    fake_ollama = None
+    if args.ollama_url:
+        server = nullcontext()
+        os.environ["OLLAMA_URL"] = args.ollama_url
+    else:
+        fake_ollama = create_fake_ollama(
+            args.latency, args.load_latency, args.prompt_latency
+        )
+        server = BackgroundServer(fake_ollama)
+    with server:
+        if fake_ollama is not None:
+            os.environ["OLLAMA_URL"] = f"{server.url}/api/chat"
+        add_service_to_path(BACKEND_SRC)
+        import main
+
+        asyncio.run(run(main))
+    if fake_ollama is not None:
+        print(f"Model loads: {fake_ollama.state.loads}")
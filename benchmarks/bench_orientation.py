@@ -0,0 +1,72 @@
+"""Report how many Tesseract OSD calls the orientation estimate avoids.
+
+Each test image is preprocessed, then the orientation estimate is timed and
+compared with the OSD pass it replaces. The images the estimate is confident
+about are the OSD calls that process_image no longer makes.
+
+Usage:
+    python benchmarks/bench_orientation.py [--min-confidence 0.5]
+"""
+
+import argparse
+import statistics
+
+from common import FRONTEND_SRC, Timer, add_service_to_path, test_image_paths
+from pytesseract.pytesseract import TesseractError
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor.image_processor import (
+    OCR_ORIENTATION_CONFIDENCE,
+    determine_image_rotation,
+    preprocessing_pipeline,
+)
+from processing_labels.image_processor.image_utils import decode_image
+from processing_labels.image_processor.orientation import (
+    estimate_orientation,
+)
+
+
+def rotation_name(rotation) -> str:
+    """Get a short name for a rotation flag."""
+    return "none" if rotation is None else rotation.name.lower()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--min-confidence", type=float, default=OCR_ORIENTATION_CONFIDENCE
+    )
+    args = parser.parse_args()
+    estimate_times, osd_times = [], []
+    avoided = agreed = 0
+    for path in test_image_paths():
+        image = preprocessing_pipeline.run(decode_image(path.read_bytes(), 2000))
+        with Timer() as timer:
+            estimate = estimate_orientation(image)
+        estimate_times.append(timer.elapsed)
+        confident = estimate["confidence"] >= args.min_confidence
+        avoided += confident
+        try:
+            with Timer() as timer:
+                osd_rotation = rotation_name(determine_image_rotation(image))
+            osd_times.append(timer.elapsed)
+        except (TesseractError, OSError):
+            # No tesseract binary, so only the estimate can be reported.
+            osd_rotation = "n/a"
+        agreed += confident and osd_rotation == rotation_name(estimate["rotation"])
+        print(
+            f"{path.name:24} estimate {rotation_name(estimate['rotation']):26} "
+            f"skew {estimate['skew_angle']:5.1f} confidence "
+            f"{estimate['confidence']:.2f} osd {osd_rotation}"
+        )
+    total = len(estimate_times)
+    print(
+        f"\nestimate: {statistics.mean(estimate_times) * 1000:.1f} ms per image, "
+        f"confident on {avoided} of {total} images, so {avoided} OSD calls avoided"
+    )
+    if osd_times:
+        print(
+            f"osd: {statistics.mean(osd_times) * 1000:.1f} ms per image, "
+            f"agrees with {agreed} of the {avoided} confident estimates"
+        )
@@ -0,0 +1,64 @@
+"""Compare per-image preprocessing time and peak memory of the old and fused steps.
+
+The old steps ran the opening on the colour image before converting to grayscale
+and allocated a new array at every step. The pipeline works in grayscale from the
+first step and reuses the worker's buffers.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from common import FRONTEND_SRC, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor.image_utils import (
+    PreprocessingPipeline,
+    decode_image,
+    get_grayscale,
+    opening,
+    thresholding,
+)
+
+
+def separate_steps(image):
+    """The previous preprocessing steps."""
+    return thresholding(get_grayscale(opening(image)))
+
+
+def measure(preprocess, images: list, repeat: int) -> tuple[float, float]:
+    """Get the median time per image in ms and the peak traced memory in MB."""
+    preprocess(images[0])
+    timings = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        for image in images:
+            start = time.perf_counter()
+            preprocess(image)
+            timings.append(time.perf_counter() - start)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-long-side", type=int, default=2000)
+    args = parser.parse_args()
+    images = [
+        decode_image(path.read_bytes(), args.max_long_side)
+        for path in test_image_paths()
+    ]
+    pipeline = PreprocessingPipeline()
+    for name, preprocess in (
+        ("separate steps", separate_steps),
+        ("pipeline", pipeline.run),
+    ):
+        milliseconds, megabytes = measure(preprocess, images, args.repeat)
+        print(f"{name}: {milliseconds:.1f} ms per image, peak {megabytes:.1f} MB")
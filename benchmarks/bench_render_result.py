@@ -0,0 +1,131 @@
+"""Compare compiling the result template per response with the cached partial.
+
+The previous render_result built a jinja2.Template from an inline string on every
+response, which compiles the template each time, and worked out the recurrence and
+the next Wednesday with datetime. It is kept below as the reference. The current
+version renders the partials/result.html template, compiled once by the Jinja
+environment, with the recurrence and start date from calendar_invite.
+
+Usage:
+    python benchmarks/bench_render_result.py [--repeat 2000]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from common import FRONTEND_SRC, Timer, add_service_to_path
+from fastapi.templating import Jinja2Templates
+from jinja2 import Template
+
+add_service_to_path(FRONTEND_SRC)
+
+from calendar_invite import build_ics, get_recurrence, get_start_date
+
+RESULT = {
+    "watering_frequency": "Weekly",
+    "name": "Jasminum azoricum",
+    "fertiliser": ["Spring", "Autumn"],
+}
+IMAGE_TEXT = (
+    "Jasminum azoricum\nPosition: Full sun to part shade\n"
+    "Watering: Moderate water requirement\n"
+    "Fertilise: Use a long-term controlled-release fertiliser in spring and autumn"
+)
+REFERENCE_TEMPLATE = """
+    <div class="success container d-flex col-sm">
+        <div class="calendar-button row g-1">
+            <div class="col-md">
+                <add-to-calendar-button
+                    name="[Reminder] Water and Fertilise your {{ result.name }} plant"
+                    startDate={{ start_date }}
+                    timeZone="currentBrowser"
+                    location="Garden"
+                    description="Fertiliser your {{ result.name }} plant as per schedule:{{', '.join(result.fertiliser)}}.<br>{{image_text}}</br>"
+                    options="'Apple','Google','iCal','Outlook.com','Yahoo'"
+                    recurrence="{{ calendar_recurrence }}"
+                    lightMode="bodyScheme"
+                    buttonStyle="date"
+                    >
+                </add-to-calendar-button>
+                </div>
+            <div class="col-md result-values mx-5">
+                <ul>
+                    <li><strong> Plant Name: </strong> {{ result.name }}</li>
+                        <li> <strong>Watering Frequency: </strong> {{ result.watering_frequency }}</li>
+                        <li><strong>Fertiliser Schedule:</strong>
+                        <ul class="fertiliser">
+                            {% for item in result.fertiliser %}
+                            <li>{{ item }}</li>
+                            {% endfor %}
+                        </ul>
+                        </li>
+                </ul>
+            </div>
+        </div>
+    </div>
+    """
+
+
+def reference_next_wednesday() -> datetime:
+    """The previous start date calculation."""
+    now = datetime.now()
+    days_until_wednesday = (2 - now.weekday() + 7) % 7
+    if days_until_wednesday == 0:
+        days_until_wednesday = 7
+    return now + timedelta(days=days_until_wednesday)
+
+
+def reference_render(result: dict, image_text: str) -> str:
+    """The previous render_result, for a result with a fertiliser schedule."""
+    start_date = reference_next_wednesday().strftime("%Y-%m-%d")
+    match result["watering_frequency"]:
+        case "Weekly":
+            calendar_recurrence = "RRULE:FREQ=WEEKLY;INTERVAL=1;WKST=MO;BYDAY=WE"
+        case _:
+            calendar_recurrence = "RRULE:FREQ=WEEKLY;INTERVAL=1;WKST=MO;BYDAY=WE,FR;"
+    return Template(REFERENCE_TEMPLATE).render(
+        result=result,
+        calendar_recurrence=calendar_recurrence,
+        start_date=start_date,
+        image_text=image_text,
+    )
+
+
+result_template = Jinja2Templates(directory=FRONTEND_SRC / "templates").get_template(
+    "partials/result.html"
+)
+
+
+def cached_render(result: dict, image_text: str) -> str:
+    """Render with the compiled partial, as render_result does."""
+    return result_template.render(
+        result=result,
+        calendar_recurrence=get_recurrence(result["watering_frequency"]),
+        start_date=get_start_date().isoformat(),
+        image_text=image_text,
+        ics_url="/calendar.ics",
+        use_widget=True,
+    )
+
+
+def ics_file(result: dict, image_text: str) -> str:
+    """Build the .ics download for the result."""
+    return build_ics(
+        result["name"], result["watering_frequency"], result["fertiliser"], image_text
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    rows = [
+        ("inline template", reference_render),
+        ("cached partial", cached_render),
+        (".ics file", ics_file),
+    ]
+    for name, func in rows:
+        with Timer() as timer:
+            for _ in range(args.repeat):
+                func(RESULT, IMAGE_TEXT)
+        print(f"{name:16} {timer.elapsed / args.repeat * 1e6:8.1f} µs per response")
@@ -0,0 +1,50 @@
+"""Measure how many labels the keyword rules resolve without the model.
+
+The label texts are the OCR outputs recorded in test_images.txt.
+
+Usage:
+    python benchmarks/bench_rule_extractor.py [--threshold 0.9]
+"""
+
+import argparse
+import time
+
+from common import BACKEND_SRC, TEST_IMAGES, add_service_to_path
+
+add_service_to_path(BACKEND_SRC)
+
+from plant_care.rule_extractor import RuleExtractor
+
+SECTION_SEPARATOR = "-----------------------------------------"
+
+
+def load_label_texts() -> dict[str, str]:
+    """Get the recorded OCR text of each test image."""
+    text = (TEST_IMAGES / "test_images.txt").read_text(encoding="utf-8")
+    labels = {}
+    for section in text.split(SECTION_SEPARATOR):
+        image_name, _, label_text = section.strip().partition("\n")
+        if image_name:
+            labels[image_name] = label_text
+    return labels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+    extractor = RuleExtractor(confidence_threshold=args.threshold)
+    labels = load_label_texts()
+    start = time.perf_counter()
+    for image_name, label_text in labels.items():
+        plant_care, confidence = extractor.extract(label_text)
+        resolved = extractor.resolve(label_text) is not None
+        print(
+            f"{image_name:20} {confidence:.2f} {'rules' if resolved else 'model':5} "
+            f"{plant_care.model_dump_json()}"
+        )
+    elapsed = time.perf_counter() - start
+    stats = extractor.stats
+    print(f"Resolved by rules: {stats['resolved']} of {len(labels)}")
+    print(f"Fast path fraction: {stats['resolved_fraction']:.0%}")
+    print(f"Time per label: {elapsed / len(labels) * 1e6:.0f} µs")
@@ -0,0 +1,67 @@
+"""Compare OCR CPU time per label for the two-pass and single-pass readers.
+
+The two-pass reader is the old behaviour of analyse_image_quality_text which ran
+image_to_data for the quality check and then image_to_string for the text.
+Tesseract runs as a child process, so the CPU time is taken from the children's
+resource usage.
+
+Usage:
+    python benchmarks/bench_single_pass_ocr.py
+"""
+
+import resource
+
+import cv2
+from common import FRONTEND_SRC, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor.image_reader import (
+    analyse_image_quality_text,
+    get_image_data,
+    get_image_text,
+    get_text_read_quality,
+)
+from processing_labels.image_processor.image_utils import (
+    get_grayscale,
+    opening,
+    thresholding,
+)
+
+
+def two_pass_read(image: cv2.typing.MatLike, config: str = r"--psm 4") -> str:
+    """The previous reader: quality check and text read are separate tesseract runs."""
+    image_data = get_image_data(image, config=config)
+    if get_text_read_quality(image_data):
+        return get_image_text(image, config=config)
+    raise ValueError("Image text read quality is too low.")
+
+
+def child_cpu_time() -> float:
+    """Get the user and system CPU time used by finished child processes."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(reader, images: list) -> float:
+    """Get the total child CPU time spent reading the images."""
+    start = child_cpu_time()
+    for image in images:
+        try:
+            reader(image)
+        except ValueError:
+            pass
+    return child_cpu_time() - start
+
+
+if __name__ == "__main__":
+    paths = test_image_paths()
+    images = [
+        thresholding(get_grayscale(opening(cv2.imread(str(path))))) for path in paths
+    ]
+    two_pass = measure(two_pass_read, images)
+    single_pass = measure(analyse_image_quality_text, images)
+    print(f"Labels: {len(images)}")
+    print(f"Two pass OCR CPU time per label: {two_pass / len(images):.3f} s")
+    print(f"Single pass OCR CPU time per label: {single_pass / len(images):.3f} s")
+    print(f"Ratio: {single_pass / two_pass:.2f}")
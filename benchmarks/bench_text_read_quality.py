@@ -0,0 +1,128 @@
+"""Compare the per-word loops with the NumPy quality check and text rebuild.
+
+A synthetic image_to_data dictionary is built with the layout tesseract returns,
+with empty block, paragraph and line entries between the words. The loop versions
+below are the previous implementations, kept here as the reference. Each OCR read
+needs both the quality check and the text, which analyse_image_data builds from a
+single conversion of the lists to arrays.
+
+The NumPy version only pulls ahead on very long reads. At the size of a real label,
+about 200 words (--words 200), the loops are as fast or faster, and the NumPy
+version is kept for its richer quality metrics.
+
+Usage:
+    python benchmarks/bench_text_read_quality.py [--words 10000] [--repeat 20]
+"""
+
+import argparse
+import random
+
+from common import FRONTEND_SRC, Timer, add_service_to_path
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor.image_reader import (
+    analyse_image_data,
+    get_text_from_image_data,
+    get_text_read_quality,
+    measure_text_read_quality,
+)
+
+WORDS = ["Position:", "Full", "sun", "Watering:", "Moderate", "water", "Fertilise"]
+
+
+def make_image_data(word_count: int, seed: int = 0) -> dict:
+    """Build an image_to_data dictionary with the given number of words."""
+    rng = random.Random(seed)
+    image_data: dict = {
+        key: []
+        for key in ("page_num", "block_num", "par_num", "line_num", "conf", "text")
+    }
+
+    def add(block_num, par_num, line_num, conf, text):
+        for key, value in zip(
+            image_data, (1, block_num, par_num, line_num, conf, text)
+        ):
+            image_data[key].append(value)
+
+    block_num = par_num = line_num = 1
+    add(block_num, 0, 0, -1, "")
+    for i in range(word_count):
+        if i and i % 8 == 0:
+            line_num += 1
+            if rng.random() < 0.3:
+                par_num += 1
+                line_num = 1
+                if rng.random() < 0.3:
+                    block_num += 1
+                    par_num = 1
+                    add(block_num, 0, 0, -1, "")
+            add(block_num, par_num, line_num, -1, "")
+        conf = rng.choice([-1, 30, 61, 95.5])
+        add(block_num, par_num, line_num, conf, rng.choice(WORDS))
+    return image_data
+
+
+def loop_read_quality(image_data: dict, confidence: int = 60) -> bool:
+    """The previous quality check."""
+    lines: dict = {}
+    for i in range(len(image_data["text"])):
+        if int(image_data["conf"][i]) > confidence:
+            line_num = image_data["line_num"][i]
+            lines.setdefault(line_num, []).append(image_data["text"][i])
+    return len(lines) > 2
+
+
+def loop_text(image_data: dict) -> str:
+    """The previous text rebuild."""
+    paragraphs: dict = {}
+    for i in range(len(image_data["text"])):
+        word = image_data["text"][i].strip()
+        if not word:
+            continue
+        paragraph_key = (
+            image_data["page_num"][i],
+            image_data["block_num"][i],
+            image_data["par_num"][i],
+        )
+        lines = paragraphs.setdefault(paragraph_key, {})
+        lines.setdefault(image_data["line_num"][i], []).append(word)
+    return "\n\n".join(
+        "\n".join(" ".join(words) for words in lines.values())
+        for lines in paragraphs.values()
+    )
+
+
+def loop_analyse(image_data: dict) -> tuple[str, bool]:
+    """The previous quality check and text rebuild of each OCR read."""
+    return loop_text(image_data), loop_read_quality(image_data)
+
+
+def measure(func, image_data: dict, repeat: int) -> float:
+    """Get the mean time of the function in milliseconds."""
+    with Timer() as timer:
+        for _ in range(repeat):
+            func(image_data)
+    return timer.elapsed / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    image_data = make_image_data(args.words)
+    assert loop_read_quality(image_data) == get_text_read_quality(image_data)
+    assert loop_text(image_data) == get_text_from_image_data(image_data)
+    rows = [
+        ("quality check, loop", loop_read_quality),
+        ("quality metrics, numpy", measure_text_read_quality),
+        ("text rebuild, loop", loop_text),
+        ("text rebuild, numpy", get_text_from_image_data),
+        ("both, loop", loop_analyse),
+        ("both, numpy", analyse_image_data),
+    ]
+    print(f"{len(image_data['text'])} entries, {args.words} words")
+    for name, func in rows:
+        print(f"{name:24} {measure(func, image_data, args.repeat):7.2f} ms")
+    print(measure_text_read_quality(image_data))
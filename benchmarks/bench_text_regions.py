@@ -0,0 +1,77 @@
+"""Compare reading the whole photo with reading only the detected text blocks.
+
+For each test image the share of the photo covered by text blocks is reported,
+then both pipelines are timed end to end and their text is compared with the
+text recorded in test_images.txt.
+
+Usage:
+    python benchmarks/bench_text_regions.py [--regions-only]
+"""
+
+import argparse
+import statistics
+import time
+
+from bench_downscale import load_recorded_texts, similarity
+from common import FRONTEND_SRC, Timer, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.image_processor import image_processor
+from processing_labels.image_processor.image_utils import decode_image
+from processing_labels.image_processor.text_regions import (
+    find_text_regions,
+)
+
+
+def read_label(image, text_regions: bool) -> tuple[str, float]:
+    """Read the label, returning the text and the latency."""
+    start = time.perf_counter()
+    try:
+        text_list = image_processor.process_image(image, text_regions=text_regions)
+        text = "\n".join(text_list)
+    except ValueError:
+        text = ""
+    return text, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--regions-only",
+        action="store_true",
+        help="only report the text blocks found, without running tesseract",
+    )
+    args = parser.parse_args()
+    images = {
+        path.stem: decode_image(path.read_bytes(), image_processor.OCR_MAX_LONG_SIDE)
+        for path in test_image_paths()
+    }
+    coverages, detection_times = [], []
+    for name, image in images.items():
+        thresh = image_processor.preprocessing_pipeline.run(image)
+        with Timer() as timer:
+            regions = find_text_regions(thresh)
+        detection_times.append(timer.elapsed)
+        covered = sum(region.width * region.height for region in regions)
+        coverages.append(covered / (thresh.shape[0] * thresh.shape[1]))
+        print(f"{name:20} {len(regions):2} blocks, {coverages[-1]:.0%} of the photo")
+    print(
+        f"detection: {statistics.mean(detection_times) * 1000:.1f} ms per image, "
+        f"blocks cover {statistics.mean(coverages):.0%} of the photo on average"
+    )
+    if args.regions_only:
+        raise SystemExit
+    recorded = load_recorded_texts()
+    for text_regions in (False, True):
+        latencies, vs_recorded = [], []
+        for name, image in images.items():
+            text, latency = read_label(image, text_regions)
+            latencies.append(latency)
+            if name in recorded:
+                vs_recorded.append(similarity(text, recorded[name]))
+        label = "text blocks" if text_regions else "whole photo"
+        print(
+            f"{label}: {statistics.mean(latencies):.2f} s per label, "
+            f"similarity to recorded text {statistics.mean(vs_recorded):.2f}"
+        )
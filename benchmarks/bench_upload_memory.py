@@ -0,0 +1,118 @@
+"""Measure the memory used by 50 concurrent 8 MB uploads, copied or memory mapped.
+
+Each upload is spooled to a SpooledTemporaryFile the way Starlette does, then
+read either with file.read(), which copies it into a bytes object, or with
+read_upload, which maps the temporary file. The photo is hashed for the OCR cache
+and, with --decode, decoded at the OCR size, and everything is held until all
+uploads are done, as it is while concurrent requests wait for OCR.
+
+Each mode runs in its own process. The anonymous memory is what the process
+allocated, and the file-backed memory is the page cache shared with the temporary
+files, which the kernel can drop under pressure.
+
+Usage:
+    python benchmarks/bench_upload_memory.py [--uploads 50] [--megabytes 8] [--decode]
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+from tempfile import SpooledTemporaryFile
+
+import cv2
+import numpy as np
+from common import FRONTEND_SRC, Timer, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from fastapi import UploadFile
+from processing_labels.image_processor.image_processor import (
+    OCR_MAX_LONG_SIDE,
+)
+from processing_labels.image_processor.image_utils import decode_image
+from processing_labels.ocr_cache import image_cache_key
+from uploads import read_upload
+
+# Starlette's spool size, above which the upload is written to disk.
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def make_photo(megabytes: float) -> bytes:
+    """Encode a 12 megapixel JPEG of about the given size from a test label."""
+    image = cv2.imread(str(test_image_paths()[0]))
+    image = cv2.resize(image, (4000, 3000))
+    rng = np.random.default_rng(0)
+    target = megabytes * 1024 * 1024
+    for noise in range(0, 64, 2):
+        noisy = cv2.add(image, rng.integers(0, noise + 1, image.shape, np.uint8))
+        photo = cv2.imencode(".jpg", noisy, [cv2.IMWRITE_JPEG_QUALITY, 95])[1]
+        if photo.nbytes >= target:
+            break
+    return photo.tobytes()
+
+
+def spool_upload(photo: bytes) -> UploadFile:
+    """Spool the photo to a temporary file like Starlette's form parser."""
+    # The upload owns the file and closes it, as in the service.
+    spooled = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)  # noqa: SIM115
+    spooled.write(photo)
+    spooled.seek(0)
+    return UploadFile(spooled, size=len(photo), filename="label.jpg")
+
+
+def memory_kib() -> dict[str, int]:
+    """Get the anonymous and file-backed resident memory of the process."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+async def ingest(file: UploadFile, mode: str, decode: bool):
+    """Read, hash and optionally decode one upload."""
+    if mode == "copy":
+        photo = await file.read()
+    else:
+        photo = await read_upload(file, max_bytes=1 << 30)
+    key = image_cache_key(photo)
+    image = None
+    if decode:
+        image = await asyncio.to_thread(decode_image, photo, OCR_MAX_LONG_SIDE)
+    return photo, key, image
+
+
+async def run_mode(mode: str, uploads: int, megabytes: float, decode: bool) -> None:
+    photo = make_photo(megabytes)
+    files = [spool_upload(photo) for _ in range(uploads)]
+    del photo
+    before = memory_kib()
+    with Timer() as timer:
+        held = await asyncio.gather(*(ingest(file, mode, decode) for file in files))
+    after = memory_kib()
+    anon = (after["RssAnon"] - before["RssAnon"]) / 1024
+    file_backed = (after["RssFile"] - before["RssFile"]) / 1024
+    print(
+        f"{mode:5} {timer.elapsed:6.2f} s, anonymous {anon:7.1f} MB, "
+        f"file-backed {file_backed:7.1f} MB for {len(held)} uploads"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--megabytes", type=float, default=8)
+    parser.add_argument("--decode", action="store_true")
+    parser.add_argument("--mode", choices=["copy", "map"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        asyncio.run(run_mode(args.mode, args.uploads, args.megabytes, args.decode))
+    else:
+        for mode in ("copy", "map"):
+            command = [sys.argv[0], "--mode", mode, "--uploads", str(args.uploads)]
+            command += ["--megabytes", str(args.megabytes)]
+            command += ["--decode"] if args.decode else []
+            subprocess.run([sys.executable, *command], check=True)
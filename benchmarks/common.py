@@ -0,0 +1,37 @@
+"""Shared paths and helpers for the benchmark scripts.
+
+The frontend and backend are separate services that are normally run inside their
+own containers, so the benchmarks put their source folders on the path directly.
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Self
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FRONTEND_SRC = REPO_ROOT / "src" / "forgetful_gardner" / "frontend" / "src"
+BACKEND_SRC = REPO_ROOT / "src" / "forgetful_gardner" / "backend" / "src"
+TEST_IMAGES = REPO_ROOT / "test" / "image_processor" / "test_images"
+
+
+def add_service_to_path(service_src: Path) -> None:
+    """Make a service's source folder importable."""
+    if str(service_src) not in sys.path:
+        sys.path.insert(0, str(service_src))
+
+
+def test_image_paths() -> list[Path]:
+    """Get the label images used for benchmarking."""
+    return sorted(TEST_IMAGES.glob("*.jpg"))
+
+
+class Timer:
+    """Measure wall time with perf_counter."""
+
+    def __enter__(self) -> Self:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self.start
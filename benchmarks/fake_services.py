@@ -0,0 +1,168 @@
+"""Local stand-ins for the backend and the Ollama server.
+
+The servers run with uvicorn in a background thread so the benchmarks can talk to
+them over real HTTP connections without the docker stack.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import Self
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+PLANT_CARE_RESULT = {
+    "watering_frequency": "Weekly",
+    "name": "Jasminum azoricum",
+    "fertiliser": ["Spring", "Autumn"],
+}
+
+
+class OCRTextQuery(BaseModel):
+    ocr_text: str
+
+
+def create_fake_backend() -> FastAPI:
+    """Create a backend that answers /extract with a fixed plant care result."""
+    app = FastAPI()
+
+    @app.post("/extract")
+    async def extract(query: OCRTextQuery):
+        return PLANT_CARE_RESULT
+
+    return app
+
+
+def parse_keep_alive(value) -> float:
+    """Get the seconds a keep_alive value keeps the model loaded, inf for forever."""
+    if value is None:
+        return 300.0
+    if isinstance(value, str):
+        units = {"s": 1, "m": 60, "h": 3600}
+        if value[-1:] in units:
+            seconds = float(value[:-1]) * units[value[-1]]
+        else:
+            seconds = float(value)
+    else:
+        seconds = float(value)
+    return float("inf") if seconds < 0 else seconds
+
+
+def create_fake_ollama(
+    latency: float = 0.0, load_latency: float = 0.0, prompt_latency: float = 0.0
+) -> FastAPI:
+    """Create an Ollama server that answers /api/chat after a fixed latency.
+
+    The server records how many chat requests it received and the highest number
+    that were in flight at the same time. Like Ollama, it unloads the model when
+    the request's keep_alive runs out, and only processes the system prompt when
+    it differs from the cached one of the previous request.
+
+    Args:
+        latency: The number of seconds each chat request takes.
+        load_latency: The extra seconds a request takes when the model is unloaded.
+        prompt_latency: The extra seconds a request takes for a new system prompt.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+    app.state.loads = 0
+    app.state.unload_at = 0.0
+    app.state.cached_prompt = None
+    app.state.last_body = None
+
+    @app.post("/api/chat")
+    async def chat(body: dict):
+        app.state.requests += 1
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+        app.state.last_body = body
+        if not body.get("messages") and parse_keep_alive(body.get("keep_alive")) == 0:
+            # An empty request with a keep_alive of 0 unloads the model.
+            app.state.in_flight -= 1
+            app.state.unload_at = 0.0
+            return {"model": body.get("model"), "done": True, "done_reason": "unload"}
+        delay = latency
+        if time.monotonic() >= app.state.unload_at:
+            app.state.loads += 1
+            app.state.cached_prompt = None
+            delay += load_latency
+        messages = body.get("messages") or [{}]
+        if messages[0].get("content") != app.state.cached_prompt:
+            app.state.cached_prompt = messages[0].get("content")
+            delay += prompt_latency
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            app.state.in_flight -= 1
+            app.state.unload_at = time.monotonic() + parse_keep_alive(
+                body.get("keep_alive")
+            )
+        content = json.dumps(PLANT_CARE_RESULT)
+        if body.get("stream"):
+            return _stream_chat(content)
+        return {
+            "model": body.get("model"),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+        }
+
+    return app
+
+
+def _stream_chat(content: str):
+    """Stream the content in small NDJSON chunks like Ollama does."""
+
+    async def chunks():
+        for start in range(0, len(content), 4):
+            message = {"role": "assistant", "content": content[start : start + 4]}
+            yield json.dumps({"message": message, "done": False}) + "\n"
+            await asyncio.sleep(0.005)
+        done = {"message": {"role": "assistant", "content": ""}, "done": True}
+        yield json.dumps(done) + "\n"
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+def get_free_port() -> int:
+    """Get a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn in a background thread.
+
+    Args:
+        app: The ASGI app to serve.
+        port: The port to listen on. A free port is used when None.
+    """
+
+    def __init__(self, app, port: int | None = None):
+        self.app = app
+        self.port = port or get_free_port()
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> Self:
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
@@ -0,0 +1,102 @@
+"""Load test showing that concurrent uploads overlap in the OCR worker pool.
+
+Without a URL the label images are run through the OCR worker pool directly, once
+one after another and once all at the same time. With a URL the images are posted
+concurrently to a running frontend's /upload endpoint. When the frontend runs with
+UPLOAD_JOBS=1 each upload is accepted at once, and its job is polled until the
+result is ready, so the time to accept an upload is reported as well.
+
+The overlap factor is the sum of the request durations divided by the wall time,
+which is about 1 when requests are serialised and up to the worker count when
+they overlap.
+
+Usage:
+    python benchmarks/load_test_upload.py [--workers 4] [--url http://localhost:8000/upload]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from common import FRONTEND_SRC, Timer, add_service_to_path, test_image_paths
+
+add_service_to_path(FRONTEND_SRC)
+
+from processing_labels.garden_label_processor import (
+    get_plant_care_text_from_image_bytes,
+)
+from processing_labels.ocr_worker_pool import OCRWorkerPool
+
+
+def ocr_or_none(image_bytes: bytes):
+    """Run the OCR and ignore unreadable labels."""
+    try:
+        return get_plant_care_text_from_image_bytes(image_bytes)
+    except RuntimeError:
+        return None
+
+
+async def timed(coro) -> float:
+    """Get the duration of a coroutine."""
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def run_pool(images: list[bytes], workers: int) -> None:
+    """Compare sequential and concurrent OCR through the worker pool."""
+    pool = OCRWorkerPool(max_workers=workers, max_queue_size=len(images))
+    pool.start()
+    with Timer() as sequential:
+        for image in images:
+            await pool.run(ocr_or_none, image)
+    with Timer() as concurrent:
+        durations = await asyncio.gather(
+            *(timed(pool.run(ocr_or_none, image)) for image in images)
+        )
+    pool.shutdown()
+    print(f"Sequential wall time: {sequential.elapsed:.2f} s")
+    print(f"Concurrent wall time: {concurrent.elapsed:.2f} s")
+    print(f"Overlap factor: {sum(durations) / concurrent.elapsed:.2f}")
+
+
+async def run_http(images: list[bytes], url: str) -> None:
+    """Post all images to the frontend at the same time."""
+    accept_times: list[float] = []
+    async with httpx.AsyncClient(timeout=120) as client:
+
+        async def post(image: bytes) -> int:
+            start = time.perf_counter()
+            response = await client.post(
+                url, files={"file": ("label.jpg", image, "image/jpeg")}
+            )
+            if response.status_code != 202:
+                return response.status_code
+            accept_times.append(time.perf_counter() - start)
+            job_url = response.url.join(response.headers["Location"])
+            # A job still in progress answers with its polling fragment.
+            while "job-pending" in response.text:
+                await asyncio.sleep(0.5)
+                response = await client.get(job_url)
+            return response.status_code
+
+        with Timer() as concurrent:
+            durations = await asyncio.gather(*(timed(post(image)) for image in images))
+    print(f"Concurrent wall time: {concurrent.elapsed:.2f} s")
+    print(f"Slowest request: {max(durations):.2f} s")
+    if accept_times:
+        print(f"Slowest upload accepted after: {max(accept_times):.2f} s")
+    print(f"Overlap factor: {sum(durations) / concurrent.elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+    images = [path.read_bytes() for path in test_image_paths()]
+    if args.url:
+        asyncio.run(run_http(images, args.url))
+    else:
+        asyncio.run(run_pool(images, args.workers))
@@ -0,0 +1,428 @@
+"""Run the end-to-end benchmark suite and compare it with the last stored run.
+
+The suite uses the label images in test/image_processor/test_images and local
+stand-ins for Ollama and the backend, so it runs without the docker stack:
+
+- frontend: the latency of each pipeline stage and of process_image for every
+  label, then the latency and throughput of /upload at each concurrency level,
+  with the OCR run for every upload and with the OCR result cached.
+- backend: the latency of invoke_ollama_model against a fake Ollama with a fixed
+  latency, and the latency and throughput of /extract at each concurrency level.
+
+Each part runs in its own process, which also reports its peak resident memory.
+The OCR stages are skipped when tesseract is not installed.
+
+The results are written to --results-dir, benchmarks/results by default, as a JSON
+file named after the time and commit. They are compared with the previous file
+there, or with --baseline. A result more than --threshold worse than the baseline
+is marked as a regression, and --check makes the run fail when there is one. The
+default folder is ignored by git, so point --results-dir at a folder that is kept,
+such as a CI cache, to track the results over time.
+
+Usage:
+    python benchmarks/run_suite.py [--repeat 5] [--concurrency 1 4 16]
+        [--ollama-latency 0.05] [--results-dir results] [--baseline <run>.json]
+        [--check]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+from common import (
+    BACKEND_SRC,
+    FRONTEND_SRC,
+    REPO_ROOT,
+    add_service_to_path,
+    test_image_paths,
+)
+from fake_services import BackgroundServer, create_fake_backend, create_fake_ollama
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# Units where a higher value is better. Latency and memory are better lower.
+HIGHER_IS_BETTER = {"req/s"}
+# Stands in for the OCR result when the upload benchmark reads from the cache.
+CACHED_LABEL_TEXT = ["Jasminum azoricum", "Water weekly", "Feed in spring and autumn"]
+
+
+def summarise(samples: list[float]) -> dict:
+    """Summarise latency samples in seconds as milliseconds.
+
+    Args:
+        samples: The measured durations in seconds.
+
+    Returns:
+        The median, 95th percentile, mean and sample count. The median is the
+        value compared between runs.
+    """
+    milliseconds = sorted(sample * 1000 for sample in samples)
+    p95 = (
+        statistics.quantiles(milliseconds, n=20)[18]
+        if len(milliseconds) > 1
+        else milliseconds[0]
+    )
+    return {
+        "unit": "ms",
+        "value": statistics.median(milliseconds),
+        "p95": p95,
+        "mean": statistics.fmean(milliseconds),
+        "n": len(milliseconds),
+    }
+
+
+def time_call(func: Callable, *args) -> tuple[float, object]:
+    """Time a blocking call, returning the seconds taken and its result."""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+async def measure_concurrency(
+    request: Callable[[int], Awaitable[None]], total: int, concurrency: int
+) -> tuple[list[float], float]:
+    """Send requests with a fixed number in flight.
+
+    Args:
+        request: Sends the request with the given index.
+        total: The number of requests to send.
+        concurrency: The number of requests in flight at the same time.
+
+    Returns:
+        The latency of each request and the throughput in requests per second.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def send(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await request(index)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(index) for index in range(total)))
+    return latencies, total / (time.perf_counter() - start)
+
+
+def peak_memory_mb() -> float:
+    """Get the peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def tesseract_available() -> bool:
+    """Check whether the tesseract binary can be run."""
+    import pytesseract
+
+    try:
+        pytesseract.get_tesseract_version()
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return False
+    return True
+
+
+def run_frontend(args: argparse.Namespace) -> dict:
+    """Benchmark the pipeline stages and the /upload endpoint."""
+    with BackgroundServer(create_fake_backend()) as backend:
+        os.environ["BACKEND_URL"] = backend.url + "/extract"
+        add_service_to_path(FRONTEND_SRC)
+        import main
+        from processing_labels.image_processor.image_processor import (
+            OCR_MAX_LONG_SIDE,
+            apply_orientation,
+            find_orientation,
+            process_image,
+        )
+        from processing_labels.image_processor.image_reader import get_image_data
+        from processing_labels.image_processor.image_utils import (
+            PreprocessingPipeline,
+            decode_image,
+        )
+        from processing_labels.image_processor.orientation import (
+            estimate_orientation,
+        )
+        from processing_labels.image_processor.text_regions import (
+            select_text_regions,
+        )
+        from processing_labels.ocr_cache import OCRResultCache, image_cache_key
+
+        ocr = tesseract_available()
+        if not ocr:
+            print(
+                "tesseract is not installed, skipping the OCR benchmarks",
+                file=sys.stderr,
+            )
+        images = [path.read_bytes() for path in test_image_paths()]
+        pipeline = PreprocessingPipeline()
+        samples: dict[str, list[float]] = {}
+        for _ in range(args.repeat):
+            for image_bytes in images:
+                stages = {}
+                stages["decode"], image = time_call(
+                    decode_image, image_bytes, OCR_MAX_LONG_SIDE
+                )
+                stages["preprocess"], thresh = time_call(pipeline.run, image)
+                stages["orientation"], _ = time_call(estimate_orientation, thresh)
+                if ocr:
+                    stages["find_orientation"], (rotation, skew) = time_call(
+                        find_orientation, thresh
+                    )
+                else:
+                    rotation, skew = None, 0.0
+                image_to_read = apply_orientation(thresh, rotation, skew)
+                stages["text_regions"], _ = time_call(
+                    select_text_regions, image_to_read
+                )
+                if ocr:
+                    stages["ocr"], _ = time_call(get_image_data, image_to_read)
+                    stages["process_image"], _ = time_call(process_image, image)
+                for stage, seconds in stages.items():
+                    samples.setdefault(f"stage.{stage}", []).append(seconds)
+        results = {name: summarise(values) for name, values in samples.items()}
+
+        async def measure_uploads(kind: str) -> None:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://frontend", timeout=None
+            ) as client:
+
+                async def upload(index: int) -> None:
+                    image = images[index % len(images)]
+                    response = await client.post(
+                        "/upload", files={"file": ("label.jpg", image, "image/jpeg")}
+                    )
+                    response.raise_for_status()
+                    # Labels the OCR cannot read still go through every stage, but
+                    # a cached label should always have a result.
+                    if kind == "upload_cached":
+                        assert 'class="error"' not in response.text, response.text
+
+                for concurrency in args.concurrency:
+                    total = max(len(images), concurrency) * args.repeat
+                    latencies, throughput = await measure_concurrency(
+                        upload, total, concurrency
+                    )
+                    name = f"{kind}.c{concurrency}"
+                    results[f"{name}.latency"] = summarise(latencies)
+                    results[f"{name}.throughput"] = {
+                        "unit": "req/s",
+                        "value": throughput,
+                    }
+
+        if ocr:
+            # Nothing is kept, so every upload runs the OCR.
+            main.ocr_cache = OCRResultCache(max_entries=0)
+            asyncio.run(measure_uploads("upload"))
+        main.ocr_cache = OCRResultCache()
+        for image_bytes in images:
+            main.ocr_cache.put([image_cache_key(image_bytes)], CACHED_LABEL_TEXT)
+        asyncio.run(measure_uploads("upload_cached"))
+        main.ocr_pool.shutdown()
+    results["memory.frontend.peak_rss"] = {"unit": "MB", "value": peak_memory_mb()}
+    return results
+
+
+def run_backend(args: argparse.Namespace) -> dict:
+    """Benchmark invoke_ollama_model and the /extract endpoint."""
+    with BackgroundServer(create_fake_ollama(args.ollama_latency)) as ollama:
+        os.environ.update(
+            OLLAMA_URL=ollama.url + "/api/chat",
+            OLLAMA_WARMUP="0",
+            OLLAMA_NUM_PARALLEL=str(max(args.concurrency)),
+            # Every text goes to the model and nothing is answered from the cache.
+            FORCE_LLM="1",
+            LLM_CACHE_SIZE="0",
+        )
+        add_service_to_path(BACKEND_SRC)
+        import main
+
+        results = {}
+
+        async def measure() -> None:
+            texts = [
+                f"Label {index}: water weekly, feed in spring" for index in range(64)
+            ]
+            latencies = []
+            for round_index in range(args.repeat):
+                for text in texts[:10]:
+                    start = time.perf_counter()
+                    await main.invoke_ollama_model(f"{text} {round_index}")
+                    latencies.append(time.perf_counter() - start)
+            results["invoke_ollama_model.latency"] = summarise(latencies)
+            # The time spent outside the fake model, which is what the code adds.
+            overhead = [latency - args.ollama_latency for latency in latencies]
+            results["invoke_ollama_model.overhead"] = summarise(overhead)
+
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://backend", timeout=None
+            ) as client:
+                for concurrency in args.concurrency:
+                    total = max(10, concurrency * 2) * args.repeat
+
+                    async def extract(
+                        index: int, concurrency: int = concurrency
+                    ) -> None:
+                        # Distinct texts, so requests are not merged by the scheduler.
+                        text = f"{texts[index % len(texts)]} c{concurrency} {index}"
+                        response = await client.post(
+                            "/extract", json={"ocr_text": text}
+                        )
+                        response.raise_for_status()
+
+                    latencies, throughput = await measure_concurrency(
+                        extract, total, concurrency
+                    )
+                    name = f"extract.c{concurrency}"
+                    results[f"{name}.latency"] = summarise(latencies)
+                    results[f"{name}.throughput"] = {
+                        "unit": "req/s",
+                        "value": throughput,
+                    }
+            await main.ollama_scheduler.close()
+            await main.ollama_client.aclose()
+
+        asyncio.run(measure())
+    results["memory.backend.peak_rss"] = {"unit": "MB", "value": peak_memory_mb()}
+    return results
+
+
+PARTS = {"frontend": run_frontend, "backend": run_backend}
+
+
+def run_part(part: str, args: argparse.Namespace) -> dict:
+    """Run one part of the suite in a new process and read its results."""
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / f"{part}.json"
+        command = [sys.executable, __file__, "--part", part, "--output", str(output)]
+        command += ["--repeat", str(args.repeat)]
+        command += ["--concurrency", *map(str, args.concurrency)]
+        command += ["--ollama-latency", str(args.ollama_latency)]
+        # The services print every request, so only their errors are shown.
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        return json.loads(output.read_text())
+
+
+def get_commit() -> str:
+    """Get the short commit hash, marked when the tree has changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if status.strip() else commit
+
+
+def find_baseline(results_dir: Path, exclude: Path) -> Path | None:
+    """Get the most recent stored run other than the one just written."""
+    runs = sorted(path for path in results_dir.glob("*.json") if path != exclude)
+    return runs[-1] if runs else None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print each result next to the baseline.
+
+    Args:
+        results: The benchmarks of this run.
+        baseline: The benchmarks of the run compared with.
+        threshold: The fraction a result can be worse by before it is a regression.
+
+    Returns:
+        The names of the regressed benchmarks.
+    """
+    regressions = []
+    print(f"{'benchmark':40} {'value':>12} {'baseline':>12} {'change':>8}")
+    for name, result in sorted(results.items()):
+        value = f"{result['value']:.2f} {result['unit']}"
+        before = baseline.get(name)
+        if before is None or not before["value"]:
+            print(f"{name:40} {value:>12} {'-':>12}")
+            continue
+        change = result["value"] / before["value"] - 1
+        worse = -change if result["unit"] in HIGHER_IS_BETTER else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:40} {value:>12} {before['value']:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--ollama-latency", type=float, default=0.05)
+    parser.add_argument("--parts", nargs="+", choices=list(PARTS), default=list(PARTS))
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--part", choices=list(PARTS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.part:
+        args.output.write_text(json.dumps(PARTS[args.part](args)))
+        return
+
+    benchmarks = {}
+    for part in args.parts:
+        print(f"Running the {part} benchmarks")
+        benchmarks.update(run_part(part, args))
+    now = datetime.now(UTC)
+    commit = get_commit()
+    run = {
+        "timestamp": now.isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {os.cpu_count()} CPUs",
+        "settings": {
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "ollama_latency": args.ollama_latency,
+        },
+        "benchmarks": benchmarks,
+    }
+    args.results_dir.mkdir(parents=True, exist_ok=True)
+    output = args.results_dir / f"{now:%Y%m%dT%H%M%S}-{commit}.json"
+    output.write_text(json.dumps(run, indent=2) + "\n")
+    print(f"Results written to {output}")
+
+    baseline_path = args.baseline or find_baseline(args.results_dir, exclude=output)
+    if baseline_path is None:
+        print("No earlier run to compare with")
+        return
+    baseline = json.loads(baseline_path.read_text())
+    print(f"Compared with {baseline_path.name} ({baseline['commit']})")
+    regressions = compare(benchmarks, baseline["benchmarks"], args.threshold)
+    if regressions and args.check:
+        sys.exit(f"{len(regressions)} benchmarks regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
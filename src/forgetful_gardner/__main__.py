@@ -0,0 +1,3 @@
+from forgetful_gardner.cli import main
+
+main()
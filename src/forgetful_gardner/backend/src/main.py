@@ -1,108 +1,273 @@
 """Back end for using LLM."""
 
-from enum import StrEnum
+import asyncio
+import json
 import os
-from typing import Optional
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
 
-import json
 import httpx
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, ValidationError
+from fastapi.responses import Response, StreamingResponse
+from plant_care.http_client import create_async_client
+from plant_care.metrics import in_progress, register_stats, stage_timer
+from plant_care.models import (
+    BatchItemResult,
+    OCRTextBatchQuery,
+    OCRTextQuery,
+    PlantCareModel,
+)
+from plant_care.response_cache import ResponseCache
+from plant_care.rule_extractor import RuleExtractor
+from plant_care.scheduler import RequestScheduler
+from plant_care.streaming import PartialJSONObjectParser, format_sse
+from plant_care.tracing import configure_tracing, trace_request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import ValidationError
 
+configure_tracing("backend")
+rule_extractor = RuleExtractor.from_env()
+response_cache = ResponseCache.from_env()
+ollama_client = create_async_client("OLLAMA", timeout=60.0)
 
-class OCRTextQuery(BaseModel):
-    """OCR Text query model."""
 
-    ocr_text: str
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The warm-up runs in the background so the app serves requests while the
+    # model loads.
+    warmup = asyncio.create_task(warm_up_model()) if OLLAMA_WARMUP else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await ollama_scheduler.close()
+    response_cache.close()
+    await ollama_client.aclose()
 
 
-class CareFrequency(StrEnum):
-    """Water frequency enum class."""
+app = FastAPI(
+    title="Plant Model",
+    description="Processes input text to provide watering and fertiliser frequency.",
+    lifespan=lifespan,
+)
+app.middleware("http")(trace_request)
 
-    weekly = "Weekly"
-    fortnightly = "Fortnightly"
-    monthly = "Monthly"
+MODEL_NAME = os.getenv("OLLAMA_MODEL")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://ollama:11434/api/chat")
+# Texts of a batch that are extracted at the same time.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
 
 
-class FertiliserFrequency(StrEnum):
-    """Fertiliser Frequency enum class."""
+# Built once so every request starts with the same system message, which lets Ollama
+# reuse the cached prompt prefix of the previous request.
+SYSTEM_PROMPT = (
+    "You are a plant care expert. You will receive text from a plant label."
+    "Extract and output the following fields as JSON:\n"
+    "- watering_frequency: one of ['weekly', 'monthly', 'none'] (string)\n"
+    "- name: well-formatted name of the plant (string)\n"
+    "- fertiliser: a list of seasons or periods (e.g. ['spring', 'autumn']) or an empty list if none\n\n"
+    "Rules:\n"
+    "- Look for words such as 'moist', 'watering', 'water' to select the watering_frequency.\n"
+    "- Look for words such as 'fertilise', 'fertiliser', and 'spring', 'autumn', 'winter', 'weekly' to select fertiliser value(s)."
+    "- If the text contains the words 'moist', 'moderate', or 'regular' (case-insensitive), set watering_frequency to 'weekly'.\n"
+    "- If fertiliser instructions mention seasons such as 'spring', 'autumn', extract all of them in a list such as ['spring', 'autumn'].\n"
+    "- Treat the input text as case-insensitive.\n"
+    "- Respond ONLY with a valid JSON object, no extra text or explanation.\n\n"
+    "Example input text:\n"
+    "'Jasminum azoricum\\nWatering: Moderate water requirement\\nFertilise: Use a long-term controlled-release fertiliser in spring and autumn'\n\n"
+    " The example input text has the words 'Watering' and 'Moderate' so the frequency is weekly."
+    "The example input text has the words 'fertiliser', 'spring and autumn' so the fertiliser is ['spring', 'autumn']\n"
+    "Expected JSON output:\n"
+    '{"watering_frequency": "weekly", "name": "Jasminum azoricum", "fertiliser": ["spring", "autumn"]}\n\n'
+    "Now extract the information from the following text:\n"
+)
+PLANT_CARE_SCHEMA = PlantCareModel.model_json_schema()
 
-    weekly = "Weekly"
-    monthly = "Monthly"
-    biannual = "Bi-Annually"
-    spring = "Spring"
-    winter = "Winter"
-    summer = "Summer"
-    autumn = "Autumn"
 
+def get_ollama_options() -> dict:
+    """Get the model options that are set in the environment.
 
-class PlantCareModel(BaseModel):
-    """Plant care model."""
+    The options are the same for every request, as Ollama reloads the model when
+    the context size changes.
+    """
+    options = {}
+    for name, env, cast in (
+        ("num_ctx", "OLLAMA_NUM_CTX", int),
+        ("num_predict", "OLLAMA_NUM_PREDICT", int),
+        ("temperature", "OLLAMA_TEMPERATURE", float),
+    ):
+        value = os.getenv(env)
+        if value:
+            options[name] = cast(value)
+    return options
 
-    watering_frequency: Optional[CareFrequency] = None
-    name: Optional[str] = ""
-    fertiliser: Optional[list[FertiliserFrequency]] = None
 
+OLLAMA_OPTIONS = get_ollama_options()
+# How long Ollama keeps the model loaded after a request, e.g. "30m" or "-1".
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
 
-app = FastAPI(
-    title="Plant Model",
-    description="Processes input text to provide watering and fertiliser frequency.",
-)
 
-MODEL_NAME = os.getenv("OLLAMA_MODEL")
-OLLAMA_URL = "http://ollama:11434/api/chat"
+def build_messages(ocr_text: str) -> list[dict]:
+    """Build the chat messages for the given text."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": ocr_text},
+    ]
+
+
+def build_chat_request(ocr_text: str, stream: bool) -> dict:
+    """Build the Ollama chat request body for the given text."""
+    body = {
+        "model": MODEL_NAME,
+        "messages": build_messages(ocr_text),
+        "stream": stream,
+        "format": PLANT_CARE_SCHEMA,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+    if OLLAMA_OPTIONS:
+        body["options"] = OLLAMA_OPTIONS
+    return body
+
+
+async def warm_up_model() -> None:
+    """Load the model and the system prompt into Ollama before the first request.
+
+    A failed warm-up is only logged, as the first request loads the model anyway.
+    """
+    start = time.perf_counter()
+    body = build_chat_request("Warm-up", stream=False)
+    # One token is enough to process the system prompt into the cache.
+    body["options"] = {**OLLAMA_OPTIONS, "num_predict": 1}
+    try:
+        async with ollama_scheduler.slot():
+            response = await ollama_client.post(OLLAMA_URL, json=body)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Model warm-up failed: {e!r}")
+        return
+    print(f"Model warm-up took {time.perf_counter() - start:.2f} s")
+
+
+@stage_timer("parse")
+def parse_model_output(content: str) -> PlantCareModel:
+    """Parse the model output into the plant care model.
+
+    Raises:
+        ValueError: If the output does not match the plant care model.
+    """
+    try:
+        return PlantCareModel.model_validate_json(content)
+    except ValidationError as e:
+        raise ValueError(
+            f"Failed to parse LLM output: {e}\n\nResponse content: {content}"
+        )
 
 
 async def invoke_ollama_model(ocr_text: str) -> PlantCareModel:
     """Invoke the ollama model with the given text."""
     print(ocr_text)
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a plant care expert. You will receive text from a plant label."
-                "Extract and output the following fields as JSON:\n"
-                "- watering_frequency: one of ['weekly', 'monthly', 'none'] (string)\n"
-                "- name: well-formatted name of the plant (string)\n"
-                "- fertiliser: a list of seasons or periods (e.g. ['spring', 'autumn']) or an empty list if none\n\n"
-                "Rules:\n"
-                "- Look for words such as 'moist', 'watering', 'water' to select the watering_frequency.\n"
-                "- Look for words such as 'fertilise', 'fertiliser', and 'spring', 'autumn', 'winter', 'weekly' to select fertiliser value(s)."
-                "- If the text contains the words 'moist', 'moderate', or 'regular' (case-insensitive), set watering_frequency to 'weekly'.\n"
-                "- If fertiliser instructions mention seasons such as 'spring', 'autumn', extract all of them in a list such as ['spring', 'autumn'].\n"
-                "- Treat the input text as case-insensitive.\n"
-                "- Respond ONLY with a valid JSON object, no extra text or explanation.\n\n"
-                "Example input text:\n"
-                "'Jasminum azoricum\\nWatering: Moderate water requirement\\nFertilise: Use a long-term controlled-release fertiliser in spring and autumn'\n\n"
-                " The example input text has the words 'Watering' and 'Moderate' so the frequency is weekly."
-                "The example input text has the words 'fertiliser', 'spring and autumn' so the fertiliser is ['spring', 'autumn']\n"
-                "Expected JSON output:\n"
-                '{"watering_frequency": "weekly", "name": "Jasminum azoricum", "fertiliser": ["spring", "autumn"]}\n\n'
-                "Now extract the information from the following text:\n"
-            ),
-        },
-        {"role": "user", "content": ocr_text},
-    ]
-
-    async with httpx.AsyncClient(timeout=httpx.Timeout(60)) as client:
-        response = await client.post(
-            OLLAMA_URL,
-            json={
-                "model": MODEL_NAME,
-                "messages": messages,
-                "stream": False,
-                "format": PlantCareModel.model_json_schema(),
-            },
+    with in_progress.labels(stage="llm").track_inprogress(), stage_timer("llm"):
+        response = await ollama_client.post(
+            OLLAMA_URL, json=build_chat_request(ocr_text, stream=False)
         )
+    response.raise_for_status()
+    content = response.json()["message"]["content"]
+    print(content)
+    return parse_model_output(content)
+
+
+async def stream_ollama_model(ocr_text: str) -> AsyncIterator[str]:
+    """Invoke the ollama model and yield the output as it is generated."""
+    async with ollama_client.stream(
+        "POST", OLLAMA_URL, json=build_chat_request(ocr_text, stream=True)
+    ) as response:
         response.raise_for_status()
-        content = response.json()["message"]["content"]
-        print(content)
-        try:
-            return PlantCareModel.model_validate_json(content)
-        except ValidationError as e:
-            raise ValueError(
-                f"Failed to parse LLM output: {e}\n\nResponse content: {content}"
-            )
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            yield chunk.get("message", {}).get("content", "")
+            if chunk.get("done"):
+                break
+
+
+async def get_plant_care(ocr_text: str, force_llm: bool = False) -> PlantCareModel:
+    """Get the plant care info.
+
+    Unambiguous labels are resolved by the keyword rules. Other labels use the
+    response cache before invoking the model.
+
+    Args:
+        ocr_text: The OCR text of the plant label.
+        force_llm: Whether to skip the keyword rules.
+
+    Returns:
+        The plant care model.
+    """
+    with stage_timer("rules"):
+        plant_care = rule_extractor.resolve(ocr_text, force_llm=force_llm)
+    if plant_care is not None:
+        return plant_care
+    cache_key = response_cache.make_key(ocr_text, MODEL_NAME)
+    response = response_cache.get(cache_key)
+    if response is None:
+        response = await ollama_scheduler.submit(cache_key, ocr_text)
+    return PlantCareModel.model_validate_json(response)
+
+
+def is_interpreted(plant_care: PlantCareModel) -> bool:
+    """Check whether the model found the watering frequency on the label."""
+    return bool(plant_care.watering_frequency)
+
+
+async def invoke_and_cache(cache_key: str, ocr_text: str) -> str:
+    """Invoke the ollama model and cache the response.
+
+    Only a response that interprets the label is cached, so a label the model
+    failed on is tried again on the next request.
+
+    Args:
+        cache_key: The response cache key of the text.
+        ocr_text: The OCR text of the plant label.
+
+    Returns:
+        The plant care model as JSON.
+    """
+    start = time.perf_counter()
+    result = await invoke_ollama_model(json.dumps(ocr_text, indent=2))
+    response = result.model_dump_json()
+    if is_interpreted(result):
+        response_cache.put(cache_key, response, time.perf_counter() - start)
+    return response
+
+
+ollama_scheduler = RequestScheduler.from_env(invoke_and_cache)
+
+register_stats(
+    "rule_extractor", lambda: rule_extractor.stats, ("resolved", "fallbacks")
+)
+register_stats("response_cache", lambda: response_cache.stats, ("hits", "misses"))
+register_stats(
+    "scheduler", lambda: ollama_scheduler.stats, ("dispatched", "deduplicated")
+)
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "rule_extractor": rule_extractor.stats,
+        "response_cache": response_cache.stats,
+        "scheduler": ollama_scheduler.stats,
+    }
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Expose the stage timings and counters in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 # used gemma3 which seemed to work okay
@@ -110,10 +275,9 @@ async def invoke_ollama_model(ocr_text: str) -> PlantCareModel:
 async def extract(ocr_text: OCRTextQuery) -> PlantCareModel:
     """Extract the plant care info"""
     # Handle bad responses and exceptions
-    json_text = json.dumps(ocr_text.ocr_text, indent=2)
     try:
-        result = await invoke_ollama_model(json_text)
-        if not result.watering_frequency:
+        result = await get_plant_care(ocr_text.ocr_text, ocr_text.force_llm)
+        if not is_interpreted(result):
             raise HTTPException(
                 status_code=400, detail={"error": "Failed to interpret label."}
             )
@@ -122,3 +286,150 @@ async def extract(ocr_text: OCRTextQuery) -> PlantCareModel:
         raise HTTPException(
             status_code=400, detail={"error": f"Failed to parse model response{e}"}
         )
+
+
+async def extract_batch_item(
+    index: int, ocr_text: str, force_llm: bool = False
+) -> BatchItemResult:
+    """Get the plant care info of one text of a batch.
+
+    Errors are returned in the result rather than raised so one bad label does
+    not fail the batch.
+    """
+    try:
+        result = await get_plant_care(ocr_text, force_llm)
+    except (ValueError, httpx.HTTPError) as e:
+        return BatchItemResult(index=index, error=f"Failed to parse model response{e}")
+    if not is_interpreted(result):
+        return BatchItemResult(index=index, error="Failed to interpret label.")
+    return BatchItemResult(index=index, result=result)
+
+
+async def extract_batch(
+    ocr_texts: Iterable[str],
+    force_llm: bool = False,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> AsyncIterator[BatchItemResult]:
+    """Get the plant care info of each text, in input order.
+
+    At most concurrency texts are in progress at a time, so a large batch holds
+    no more than that many finished results while waiting on an earlier one.
+    The texts go through the same keyword rules, response cache and scheduler as
+    single requests, so duplicates in the batch share one model call.
+
+    Args:
+        ocr_texts: The OCR texts of the plant labels.
+        force_llm: Whether to skip the keyword rules.
+        concurrency: The number of texts in progress at a time.
+
+    Yields:
+        The result of each text.
+    """
+    window: deque[asyncio.Task[BatchItemResult]] = deque()
+    try:
+        for index, ocr_text in enumerate(ocr_texts):
+            window.append(
+                asyncio.create_task(extract_batch_item(index, ocr_text, force_llm))
+            )
+            if len(window) >= concurrency:
+                yield await window.popleft()
+        while window:
+            yield await window.popleft()
+    finally:
+        # A client that disconnects from the stream stops the rest of the batch.
+        for task in window:
+            task.cancel()
+
+
+async def stream_batch(
+    ocr_texts: list[str], force_llm: bool = False
+) -> AsyncIterator[str]:
+    """Get the plant care info of each text as newline delimited JSON."""
+    async for item in extract_batch(ocr_texts, force_llm):
+        yield item.model_dump_json() + "\n"
+
+
+@app.post("/extract/batch", response_model=list[BatchItemResult])
+async def extract_batch_endpoint(
+    query: OCRTextBatchQuery,
+) -> list[BatchItemResult] | StreamingResponse:
+    """Extract the plant care info of a batch of texts.
+
+    The results are in input order, each with the care info or an error.
+    """
+    if len(query.ocr_texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail={"error": f"A batch can have at most {BATCH_MAX_ITEMS} texts."},
+        )
+    if query.stream:
+        return StreamingResponse(
+            stream_batch(query.ocr_texts, query.force_llm),
+            media_type="application/x-ndjson",
+        )
+    return [item async for item in extract_batch(query.ocr_texts, query.force_llm)]
+
+
+async def stream_plant_care(
+    ocr_text: str, force_llm: bool = False
+) -> AsyncIterator[str]:
+    """Get the plant care info as server-sent events.
+
+    A "field" event is sent as soon as each field is complete, followed by a
+    "result" event with the validated model, or an "error" event.
+
+    Args:
+        ocr_text: The OCR text of the plant label.
+        force_llm: Whether to skip the keyword rules.
+
+    Yields:
+        The server-sent events.
+    """
+    try:
+        with stage_timer("rules"):
+            plant_care = rule_extractor.resolve(ocr_text, force_llm=force_llm)
+        cache_key = response_cache.make_key(ocr_text, MODEL_NAME)
+        if plant_care is None and (cached := response_cache.get(cache_key)):
+            plant_care = PlantCareModel.model_validate_json(cached)
+        if plant_care is None:
+            start = time.perf_counter()
+            parser = PartialJSONObjectParser()
+            content = ""
+            async with ollama_scheduler.slot():
+                with (
+                    in_progress.labels(stage="llm").track_inprogress(),
+                    stage_timer("llm"),
+                ):
+                    async for chunk in stream_ollama_model(
+                        json.dumps(ocr_text, indent=2)
+                    ):
+                        content += chunk
+                        for field, value in parser.feed(chunk):
+                            yield format_sse("field", json.dumps({field: value}))
+            plant_care = parse_model_output(content)
+            if is_interpreted(plant_care):
+                response_cache.put(
+                    cache_key, plant_care.model_dump_json(), time.perf_counter() - start
+                )
+        else:
+            for field, value in plant_care.model_dump(mode="json").items():
+                yield format_sse("field", json.dumps({field: value}))
+        if not is_interpreted(plant_care):
+            yield format_sse(
+                "error", json.dumps({"error": "Failed to interpret label."})
+            )
+        else:
+            yield format_sse("result", plant_care.model_dump_json())
+    except (ValueError, httpx.HTTPError) as e:
+        yield format_sse(
+            "error", json.dumps({"error": f"Failed to parse model response{e}"})
+        )
+
+
+@app.post("/extract/stream")
+async def extract_stream(ocr_text: OCRTextQuery) -> StreamingResponse:
+    """Stream the plant care info as server-sent events."""
+    return StreamingResponse(
+        stream_plant_care(ocr_text.ocr_text, ocr_text.force_llm),
+        media_type="text/event-stream",
+    )
@@ -0,0 +1,49 @@
+"""A pooled HTTP client for the model server.
+
+Each service is built as its own image, so this module is a copy of the
+frontend's http_client.py. The two are kept the same, and the settings
+they read are listed in the README.
+"""
+
+import os
+
+import httpx
+from opentelemetry.propagate import inject
+
+
+async def inject_trace_context(request: httpx.Request) -> None:
+    """Add the current trace context to the request headers."""
+    inject(request.headers)
+
+
+def create_async_client(prefix: str, timeout: float) -> httpx.AsyncClient:
+    """Create a pooled async client configured with environment variables.
+
+    The settings are read from variables named after the prefix, for example
+    OLLAMA_MAX_CONNECTIONS for the prefix "OLLAMA".
+
+    Args:
+        prefix: The environment variable prefix.
+        timeout: The default number of seconds to wait for a response.
+
+    Returns:
+        An async client that keeps connections alive between requests and passes
+        on the trace context.
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv(f"{prefix}_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv(f"{prefix}_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv(f"{prefix}_KEEPALIVE_EXPIRY", "30")),
+    )
+    # Retries only apply to failed connection attempts, never to sent requests.
+    transport = httpx.AsyncHTTPTransport(
+        limits=limits, retries=int(os.getenv(f"{prefix}_RETRIES", "2"))
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            float(os.getenv(f"{prefix}_TIMEOUT", str(timeout))),
+            connect=float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", "5")),
+        ),
+        event_hooks={"request": [inject_trace_context]},
+    )
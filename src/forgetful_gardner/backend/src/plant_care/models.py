@@ -0,0 +1,59 @@
+"""Request and response models for the plant care extraction."""
+
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+
+class OCRTextQuery(BaseModel):
+    """OCR Text query model."""
+
+    ocr_text: str
+    force_llm: bool = False
+
+
+class OCRTextBatchQuery(BaseModel):
+    """Batch of OCR texts query model.
+
+    With stream set, the results are sent as newline delimited JSON.
+    """
+
+    ocr_texts: list[str]
+    force_llm: bool = False
+    stream: bool = False
+
+
+class CareFrequency(StrEnum):
+    """Water frequency enum class."""
+
+    weekly = "Weekly"
+    fortnightly = "Fortnightly"
+    monthly = "Monthly"
+
+
+class FertiliserFrequency(StrEnum):
+    """Fertiliser Frequency enum class."""
+
+    weekly = "Weekly"
+    monthly = "Monthly"
+    biannual = "Bi-Annually"
+    spring = "Spring"
+    winter = "Winter"
+    summer = "Summer"
+    autumn = "Autumn"
+
+
+class PlantCareModel(BaseModel):
+    """Plant care model."""
+
+    watering_frequency: CareFrequency | None = None
+    name: str | None = ""
+    fertiliser: list[FertiliserFrequency] | None = None
+
+
+class BatchItemResult(BaseModel):
+    """Result of one OCR text of a batch, with either the care info or an error."""
+
+    index: int
+    result: PlantCareModel | None = None
+    error: str | None = None
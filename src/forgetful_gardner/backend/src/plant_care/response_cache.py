@@ -0,0 +1,175 @@
+"""A cache of LLM responses keyed on normalised label text."""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import TypedDict
+
+
+class ResponseCacheStats(TypedDict):
+    """The response cache metrics."""
+
+    hits: int
+    misses: int
+    hit_rate: float
+    time_saved_seconds: float
+    entries: int
+
+
+def normalise_text(text: str) -> str:
+    """Normalise OCR text so small reading differences share a cache entry.
+
+    The text is case-folded, punctuation and stray symbols are removed, single
+    character fragments are dropped and whitespace is collapsed.
+
+    Args:
+        text: The OCR text.
+
+    Returns:
+        The normalised text.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"[^\w\s]|_", " ", text)
+    return " ".join(word for word in text.split() if len(word) > 1 or word.isdigit())
+
+
+class ResponseCache:
+    """An LRU cache of model responses with a TTL and an optional SQLite store.
+
+    Each entry keeps how long the model took to produce it, so hits can report
+    the time saved.
+
+    Args:
+        max_entries: The number of responses kept in memory.
+        ttl: The number of seconds a response stays valid.
+        db_path: The SQLite database file that persists responses across restarts.
+            Disabled when None.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 24 * 60 * 60,
+        db_path: Path | str | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str, float]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                "response TEXT NOT NULL, duration REAL NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Create a cache configured with environment variables."""
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60))),
+            db_path=os.getenv("LLM_CACHE_DB") or None,
+        )
+
+    @staticmethod
+    def make_key(ocr_text: str, model_name: str | None) -> str:
+        """Get the cache key for the text and model.
+
+        Args:
+            ocr_text: The OCR text sent to the model.
+            model_name: The model that answers the request.
+
+        Returns:
+            The cache key.
+        """
+        normalised = normalise_text(ocr_text)
+        return hashlib.sha256(f"{model_name}\0{normalised}".encode()).hexdigest()
+
+    @property
+    def stats(self) -> ResponseCacheStats:
+        """The cache hit rate and the model time saved by hits."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "time_saved_seconds": round(self.time_saved, 3),
+            "entries": len(self._entries),
+        }
+
+    def get(self, key: str) -> str | None:
+        """Get a cached response.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached response, or None on a miss.
+        """
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute(
+                "SELECT created_at, response, duration FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                entry = (row[0], row[1], row[2])
+                self._put_in_memory(key, entry)
+        if entry is None or now - entry[0] > self.ttl:
+            if entry is not None:
+                self._delete(key)
+            self.misses += 1
+            return None
+        _, response, duration = entry
+        self.hits += 1
+        self.time_saved += duration
+        return response
+
+    def put(self, key: str, response: str, duration: float) -> None:
+        """Store a response.
+
+        Args:
+            key: The cache key.
+            response: The model response.
+            duration: The number of seconds the model took to respond.
+        """
+        entry = (time.time(), response, duration)
+        self._put_in_memory(key, entry)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, duration, entry[0]),
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the persistent store."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _put_in_memory(self, key: str, entry: tuple[float, str, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
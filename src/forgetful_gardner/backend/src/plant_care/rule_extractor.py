@@ -0,0 +1,219 @@
+"""A keyword extractor that resolves unambiguous labels without the model.
+
+The rules follow the ones given to the model in the system prompt: care words such
+as 'moist', 'moderate' or 'regular' mean weekly watering, and seasons mentioned with
+fertiliser instructions make up the fertiliser schedule.
+"""
+
+import os
+import re
+from typing import ClassVar
+
+from .models import CareFrequency, FertiliserFrequency, PlantCareModel
+
+WATERING_LINE = re.compile(r"\bwater(?:ing|ed|s)?\b", re.IGNORECASE)
+FERTILISER_LINE = re.compile(r"\b(?:fertili[sz]\w*|feed\w*)\b", re.IGNORECASE)
+WEEKLY_WATERING = re.compile(
+    r"\b(?:moist|moderate|moderately|regular|regularly)\b", re.IGNORECASE
+)
+EXPLICIT_FREQUENCY = re.compile(r"\b(weekly|fortnightly|monthly)\b", re.IGNORECASE)
+FERTILISER_PERIODS = re.compile(
+    r"\b(spring|summer|autumn|winter|weekly|monthly)\b", re.IGNORECASE
+)
+LABEL_HEADINGS = re.compile(
+    r"\b(?:position|soil|soll|watering|water|fertili[sz]\w*|use|uses|care|planting"
+    r"|height|width|description|growing|tips|sun|shade)\b",
+    re.IGNORECASE,
+)
+# A capitalised genus followed by a lower case species, e.g. "Sutera cordata".
+BINOMIAL_NAME = re.compile(r"^[A-Z][a-z]{2,} [a-z]{3,}\b")
+NAME_LINE = re.compile(r"^[A-Za-z][A-Za-z'’ -]{2,40}$")
+# Verbs and small words that make a line an instruction or a sentence, such as
+# "Keep away from frost", rather than a plant name.
+INSTRUCTION_WORDS = re.compile(
+    r"\b(?:keep|remove|avoid|protect|prune|place|grow|cut|trim|apply|mulch"
+    r"|allow|ensure|add|give|repot|store|check|dig|from|away|with|into|onto"
+    r"|the|a|an|and|or|to|for|in|on|at|of|by|your|this|that|is|are|be|will|can"
+    r"|not|do|don't|best|well|after|before|until|when|during)\b",
+    re.IGNORECASE,
+)
+# The name is usually printed at the top of the label. Names found further down
+# are less certain.
+NAME_LINES = 3
+# The confidence in a frequency when the label gives more than one, as in "water
+# weekly in summer, monthly in winter", which is left to the model.
+AMBIGUOUS_CONFIDENCE = 0.2
+
+
+def find_watering_frequency(lines: list[str]) -> tuple[CareFrequency | None, float]:
+    """Find the watering frequency and how confident the match is.
+
+    Args:
+        lines: The label text lines.
+
+    Returns:
+        The watering frequency, or None, and a confidence between 0 and 1. The
+        confidence is low when the label gives more than one frequency.
+    """
+    watering_lines = [line for line in lines if WATERING_LINE.search(line)]
+    for candidates, confidence in ((watering_lines, 1.0), (lines, 0.7)):
+        frequencies: list[CareFrequency] = []
+        for line in candidates:
+            found = [
+                CareFrequency(match.group(1).capitalize())
+                for match in EXPLICIT_FREQUENCY.finditer(line)
+            ]
+            if WEEKLY_WATERING.search(line):
+                found.append(CareFrequency.weekly)
+            frequencies += [item for item in found if item not in frequencies]
+        if len(frequencies) > 1:
+            return frequencies[0], AMBIGUOUS_CONFIDENCE
+        if frequencies:
+            return frequencies[0], confidence
+    return None, 0.0
+
+
+def find_fertiliser(lines: list[str]) -> tuple[list[FertiliserFrequency], float]:
+    """Find the fertiliser schedule and how confident the match is.
+
+    The line that mentions fertiliser is searched, along with the line after it
+    when label text wraps the instruction. A next line that starts another
+    instruction, such as the watering one, is left out.
+
+    Args:
+        lines: The label text lines.
+
+    Returns:
+        The fertiliser periods, empty when no fertiliser is mentioned, and a
+        confidence between 0 and 1.
+    """
+    periods: list[FertiliserFrequency] = []
+    mentioned = False
+    for index, line in enumerate(lines):
+        if not FERTILISER_LINE.search(line):
+            continue
+        mentioned = True
+        text = line
+        if index + 1 < len(lines) and not (
+            WATERING_LINE.search(lines[index + 1])
+            or LABEL_HEADINGS.search(lines[index + 1])
+        ):
+            text += " " + lines[index + 1]
+        for match in FERTILISER_PERIODS.finditer(text):
+            period = FertiliserFrequency(match.group(1).capitalize())
+            if period not in periods:
+                periods.append(period)
+    if not mentioned:
+        return [], 1.0
+    # Fertiliser is mentioned but without a period the model may still infer one.
+    return periods, 1.0 if periods else 0.5
+
+
+def find_name(lines: list[str]) -> tuple[str, float]:
+    """Find the plant name and how confident the match is.
+
+    Headings and instructions are skipped, and only a botanical name near the top
+    of the label is trusted fully.
+
+    Args:
+        lines: The label text lines.
+
+    Returns:
+        The plant name and a confidence between 0 and 1.
+    """
+    candidates = [
+        (index, line)
+        for index, line in enumerate(lines)
+        if NAME_LINE.match(line)
+        and not LABEL_HEADINGS.search(line)
+        and not INSTRUCTION_WORDS.search(line)
+    ]
+    for index, line in candidates:
+        if BINOMIAL_NAME.match(line):
+            return line, 1.0 if index < NAME_LINES else 0.6
+    for index, line in candidates:
+        if len(line.split()) >= 2:
+            return line.title(), 0.5
+    return "", 0.0
+
+
+class RuleExtractor:
+    """Resolve plant care info from label text with keyword rules.
+
+    Args:
+        confidence_threshold: The confidence needed to skip the model.
+        force_llm: Whether to always use the model.
+    """
+
+    # How much each field contributes to the overall confidence.
+    WEIGHTS: ClassVar[dict[str, float]] = {
+        "watering_frequency": 0.6,
+        "name": 0.3,
+        "fertiliser": 0.1,
+    }
+
+    def __init__(self, confidence_threshold: float = 0.9, force_llm: bool = False):
+        self.confidence_threshold = confidence_threshold
+        self.force_llm = force_llm
+        self.resolved = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls) -> "RuleExtractor":
+        """Create a rule extractor configured with environment variables."""
+        return cls(
+            confidence_threshold=float(os.getenv("RULE_CONFIDENCE_THRESHOLD", "0.9")),
+            force_llm=os.getenv("FORCE_LLM", "0") == "1",
+        )
+
+    @property
+    def stats(self) -> dict:
+        """The number of requests resolved by the rules and passed to the model."""
+        total = self.resolved + self.fallbacks
+        return {
+            "resolved": self.resolved,
+            "fallbacks": self.fallbacks,
+            "resolved_fraction": self.resolved / total if total else 0.0,
+        }
+
+    def extract(self, ocr_text: str) -> tuple[PlantCareModel, float]:
+        """Extract the plant care info with the keyword rules.
+
+        Args:
+            ocr_text: The OCR text of the plant label.
+
+        Returns:
+            The plant care model and a confidence between 0 and 1.
+        """
+        lines = [line.strip() for line in ocr_text.splitlines() if line.strip()]
+        watering_frequency, watering_confidence = find_watering_frequency(lines)
+        name, name_confidence = find_name(lines)
+        fertiliser, fertiliser_confidence = find_fertiliser(lines)
+        confidence = (
+            self.WEIGHTS["watering_frequency"] * watering_confidence
+            + self.WEIGHTS["name"] * name_confidence
+            + self.WEIGHTS["fertiliser"] * fertiliser_confidence
+        )
+        plant_care = PlantCareModel(
+            watering_frequency=watering_frequency, name=name, fertiliser=fertiliser
+        )
+        return plant_care, round(confidence, 3)
+
+    def resolve(self, ocr_text: str, force_llm: bool = False) -> PlantCareModel | None:
+        """Get the plant care info when the rules are confident enough.
+
+        Args:
+            ocr_text: The OCR text of the plant label.
+            force_llm: Whether this request must use the model.
+
+        Returns:
+            The plant care model, or None when the model should be used.
+        """
+        if self.force_llm or force_llm:
+            return None
+        plant_care, confidence = self.extract(ocr_text)
+        if plant_care.watering_frequency and confidence >= self.confidence_threshold:
+            self.resolved += 1
+            return plant_care
+        self.fallbacks += 1
+        return None
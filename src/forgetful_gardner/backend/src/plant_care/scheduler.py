@@ -0,0 +1,165 @@
+"""A request scheduler that coalesces concurrent model calls."""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import TypedDict
+
+
+class SchedulerStats(TypedDict):
+    """The scheduler queue and wait time metrics."""
+
+    queue_depth: int
+    in_flight: int
+    max_in_flight: int
+    dispatched: int
+    deduplicated: int
+    mean_wait_seconds: float
+    max_wait_seconds: float
+
+
+class RequestScheduler[T]:
+    """Bound the model calls in flight and merge identical requests.
+
+    Requests are dispatched in arrival order as soon as one of the model server's
+    parallel slots is free. Requests with the same key as a queued or running
+    request share its result instead of calling the model again. Ollama takes one
+    prompt per chat call, so requests are not grouped into a single call.
+
+    Args:
+        handler: The coroutine function that calls the model with a key and payload.
+        max_in_flight: The number of model calls allowed at the same time.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, str], Awaitable[T]],
+        max_in_flight: int = 1,
+    ):
+        self.handler = handler
+        self.max_in_flight = max_in_flight
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._pending: dict[str, asyncio.Future] = {}
+        self._dispatcher: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self.dispatched = 0
+        self.deduplicated = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @classmethod
+    def from_env(
+        cls, handler: Callable[[str, str], Awaitable[T]]
+    ) -> "RequestScheduler[T]":
+        """Create a scheduler configured with environment variables.
+
+        OLLAMA_NUM_PARALLEL should match the setting of the Ollama server.
+        """
+        return cls(handler, max_in_flight=int(os.getenv("OLLAMA_NUM_PARALLEL", "1")))
+
+    @property
+    def stats(self) -> SchedulerStats:
+        """The queue depth and the time requests waited for a model call."""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "in_flight": len(self._running),
+            "max_in_flight": self.max_in_flight,
+            "dispatched": self.dispatched,
+            "deduplicated": self.deduplicated,
+            "mean_wait_seconds": (
+                self._total_wait / self.dispatched if self.dispatched else 0.0
+            ),
+            "max_wait_seconds": self._max_wait,
+        }
+
+    async def submit(self, key: str, payload: str) -> T:
+        """Schedule a model call, or join the identical one already scheduled.
+
+        Args:
+            key: The key that identifies identical requests.
+            payload: The input passed to the handler.
+
+        Returns:
+            The handler result.
+        """
+        future = self._pending.get(key)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            # The call runs in the context of the request that scheduled it, so
+            # its spans join that request's trace.
+            self._queue.put_nowait(
+                (
+                    key,
+                    payload,
+                    future,
+                    time.perf_counter(),
+                    contextvars.copy_context(),
+                )
+            )
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = asyncio.create_task(self._dispatch())
+        # Shield the shared future so one cancelled caller does not cancel the others.
+        return await asyncio.shield(future)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the model call slots, for calls made outside the queue."""
+        async with self._semaphore:
+            yield
+
+    async def close(self) -> None:
+        """Stop dispatching, cancel the queued requests and wait for the running calls.
+
+        Callers waiting on a queued request get a CancelledError instead of waiting
+        forever.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        while not self._queue.empty():
+            key, _, future, _, _ = self._queue.get_nowait()
+            future.cancel()
+            self._pending.pop(key, None)
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _dispatch(self) -> None:
+        while True:
+            # Wait for a slot before taking the next request, so the requests that
+            # cannot start yet stay in the queue and close() can cancel them.
+            await self._semaphore.acquire()
+            try:
+                *item, context = await self._queue.get()
+            except asyncio.CancelledError:
+                self._semaphore.release()
+                raise
+            task = asyncio.create_task(self._run(*item), context=context)
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(
+        self, key: str, payload: str, future: asyncio.Future, queued_at: float
+    ) -> None:
+        wait = time.perf_counter() - queued_at
+        self.dispatched += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        try:
+            result = await self.handler(key, payload)
+        # Passed on to every caller waiting for the result.
+        except Exception as e:  # noqa: BLE001
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._pending.pop(key, None)
+            self._semaphore.release()
@@ -0,0 +1,88 @@
+"""Helpers for streaming the model output as server-sent events."""
+
+import json
+from typing import Any
+
+
+def format_sse(event: str, data: str) -> str:
+    """Format a server-sent event.
+
+    Args:
+        event: The event name.
+        data: The event data. Each line is sent as its own data field.
+
+    Returns:
+        The event in the text/event-stream format.
+    """
+    data_lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {event}\n{data_lines}\n"
+
+
+class PartialJSONObjectParser:
+    """Parse the fields of a JSON object as its text arrives in chunks.
+
+    A field is returned once its value is complete, so the first fields of the
+    model output can be shown before the rest of the object is generated.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._started = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        """Add a chunk of text and get the fields it completed.
+
+        Args:
+            chunk: The next chunk of the JSON text.
+
+        Returns:
+            The completed field names and values, in order.
+
+        Raises:
+            ValueError: If the text is not a JSON object.
+        """
+        self._buffer += chunk
+        fields = []
+        while (field := self._next_field()) is not None:
+            fields.append(field)
+        return fields
+
+    def _skip_whitespace(self, position: int) -> int:
+        while position < len(self._buffer) and self._buffer[position].isspace():
+            position += 1
+        return position
+
+    def _next_field(self) -> tuple[str, Any] | None:
+        buffer = self._buffer
+        position = self._skip_whitespace(self._position)
+        if position >= len(buffer):
+            return None
+        if not self._started:
+            if buffer[position] != "{":
+                raise ValueError("The model output is not a JSON object.")
+            self._started = True
+            self._position = position + 1
+            position = self._skip_whitespace(self._position)
+        if position < len(buffer) and buffer[position] == ",":
+            position = self._skip_whitespace(position + 1)
+        if position >= len(buffer) or buffer[position] == "}":
+            return None
+        try:
+            key, position = self._decoder.raw_decode(buffer, position)
+            position = self._skip_whitespace(position)
+            if position >= len(buffer) or buffer[position] != ":":
+                return None
+            value, end = self._decoder.raw_decode(
+                buffer, self._skip_whitespace(position + 1)
+            )
+        except json.JSONDecodeError:
+            return None
+        # Wait for the delimiter, since a number at the end of the buffer may
+        # still be missing digits.
+        delimiter = self._skip_whitespace(end)
+        if delimiter >= len(buffer) or buffer[delimiter] not in ",}":
+            return None
+        self._position = end
+        return key, value
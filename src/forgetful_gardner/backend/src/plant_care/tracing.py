@@ -0,0 +1,95 @@
+"""OpenTelemetry tracing for the plant care extraction.
+
+The spans are made with the OpenTelemetry API, which records nothing until a
+tracer provider is set up. configure_tracing sets one up from OTEL_TRACES_EXPORTER:
+"console" prints each finished span, "file" appends the spans as JSON lines to
+OTEL_TRACES_FILE and "none", the default, leaves tracing off. Neither exporter
+needs a collector, so traces can be read offline.
+
+The trace context is passed on in the traceparent header of the calls between the
+services, so an upload, its extraction and its model call share one trace.
+
+Each service is built as its own image, so this module is a copy of the
+frontend's processing_labels/tracing.py, without the thread pool helper. The
+functions the two share are kept the same.
+"""
+
+import os
+
+from fastapi import Request, Response
+from opentelemetry import trace
+from opentelemetry.propagate import extract
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+tracer = trace.get_tracer("forgetful_gardener")
+
+
+def configure_tracing(service_name: str) -> None:
+    """Set up the tracer provider with the exporter named by OTEL_TRACES_EXPORTER.
+
+    Args:
+        service_name: The service name recorded with the spans, unless
+            OTEL_SERVICE_NAME is set.
+
+    Raises:
+        ValueError: If the exporter is not "console", "file" or "none".
+    """
+    exporter_name = os.getenv("OTEL_TRACES_EXPORTER", "none")
+    if exporter_name == "none":
+        return
+    if exporter_name not in ("console", "file"):
+        raise ValueError(f"Unknown OTEL_TRACES_EXPORTER: {exporter_name}")
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+    except ImportError:
+        print("Tracing is off, it needs the SDK: pip install opentelemetry-sdk")
+        return
+    if exporter_name == "file":
+        # The exporter writes to the file for as long as the service runs.
+        traces_file = open(  # noqa: SIM115
+            os.getenv("OTEL_TRACES_FILE", "traces.jsonl"), "a", encoding="utf-8"
+        )
+        exporter = ConsoleSpanExporter(
+            out=traces_file,
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    else:
+        exporter = ConsoleSpanExporter()
+    resource = Resource.create(
+        {"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}
+    )
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    print(f"Tracing {service_name} with the {exporter_name} exporter")
+
+
+async def trace_request(request: Request, call_next) -> Response:
+    """Run the request in a server span, continuing the caller's trace.
+
+    A streamed response is still being sent when the span ends, so the span
+    covers the time to the response headers.
+    """
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=extract(request.headers),
+        kind=SpanKind.SERVER,
+        attributes={
+            "http.request.method": request.method,
+            "url.path": request.url.path,
+        },
+    ) as span:
+        response = await call_next(request)
+        # Named after the route once it is known, so job ids do not each make a
+        # span name of their own.
+        if route := request.scope.get("route"):
+            span.update_name(f"{request.method} {route.path}")
+        span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+        return response
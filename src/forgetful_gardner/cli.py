@@ -0,0 +1,370 @@
+"""Command line tools for the forgetful gardener.
+
+The batch command reads a folder of label photos and extracts their plant care
+details in bulk:
+
+    forgetful-gardner batch ./labels --output labels.jsonl
+
+OCR runs over a process pool and the extraction requests are sent to the backend
+with bounded concurrency. Each result is appended to the JSONL file as soon as it
+is ready, so an interrupted run picks up where it stopped when run again.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TypedDict
+
+import httpx
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+DEFAULT_BACKEND_URL = "http://localhost:8001/extract"
+# Seconds between the progress lines printed during a batch run.
+PROGRESS_INTERVAL = 10.0
+
+
+class BatchRecord(TypedDict):
+    """A line of the batch output file."""
+
+    image: str
+    ocr_text: str | None
+    care: dict | None
+    error: str | None
+    ocr_seconds: float
+    extract_seconds: float
+
+
+def read_label_text(image_path: str) -> tuple[str | None, float]:
+    """Read the label text of one image in a worker process.
+
+    Args:
+        image_path: The path of the label photo.
+
+    Returns:
+        The label text, or None if the label could not be read, and the OCR time.
+    """
+    # Imported in the worker so the parent process does not load OpenCV.
+    from forgetful_gardner.frontend.src.processing_labels import garden_label_processor
+
+    start = time.perf_counter()
+    image_text_list = garden_label_processor.get_plant_care_text(image_path)
+    image_text = "\n".join(image_text_list) if image_text_list else None
+    return image_text, time.perf_counter() - start
+
+
+def find_images(directory: Path) -> list[Path]:
+    """Find the label photos in the directory and its subdirectories."""
+    return sorted(
+        path
+        for path in directory.rglob("*")
+        if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+def load_finished(
+    output: Path, retry_failed: bool, ocr_only: bool
+) -> tuple[set[str], dict[str, str]]:
+    """Get the images already recorded in the output file.
+
+    A record from an --ocr-only run has no care details, so it only counts as
+    finished when this run is also OCR only. Its label text is returned instead,
+    so the image is not read again. The same goes for an image whose extraction
+    failed, when it is retried.
+
+    Args:
+        output: The JSONL output file of a previous run.
+        retry_failed: Whether images that failed before should be read again.
+        ocr_only: Whether this run skips the extraction.
+
+    Returns:
+        The image paths to skip, and the label text already read for the images
+        still to process.
+    """
+    finished: set[str] = set()
+    read_texts: dict[str, str] = {}
+    if not output.exists():
+        return finished, read_texts
+    with output.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run.
+                continue
+            image = record["image"]
+            # The last line for an image is its result.
+            if record.get("ocr_text"):
+                read_texts[image] = record["ocr_text"]
+            else:
+                read_texts.pop(image, None)
+            if record.get("error"):
+                if not retry_failed:
+                    finished.add(image)
+            elif ocr_only or record.get("care") is not None:
+                finished.add(image)
+    for image in finished:
+        read_texts.pop(image, None)
+    return finished, read_texts
+
+
+def end_partial_line(output: Path) -> None:
+    """End a line cut short by an interrupted run so new records start cleanly."""
+    if not output.exists() or output.stat().st_size == 0:
+        return
+    with output.open("rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+class BatchStats:
+    """Throughput counters for a batch run."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.ocr_seconds = 0.0
+        self.extract_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, record: BatchRecord) -> None:
+        """Count a finished image."""
+        self.done += 1
+        self.failed += record["error"] is not None
+        self.ocr_seconds += record["ocr_seconds"]
+        self.extract_seconds += record["extract_seconds"]
+
+    def summary(self) -> str:
+        """Describe the progress and throughput so far."""
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        done = max(self.done, 1)
+        return (
+            f"{self.done}/{self.total} images, {self.failed} failed, "
+            f"{rate:.2f} images/s, OCR {self.ocr_seconds / done:.2f} s "
+            f"and extraction {self.extract_seconds / done:.2f} s per image"
+        )
+
+
+async def extract_care(
+    client: httpx.AsyncClient, backend_url: str, ocr_text: str
+) -> dict:
+    """Send the label text to the backend and return the plant care details."""
+    response = await client.post(backend_url, json={"ocr_text": ocr_text})
+    response.raise_for_status()
+    return response.json()
+
+
+async def process_image(
+    image_path: Path,
+    pool: ProcessPoolExecutor,
+    client: httpx.AsyncClient | None,
+    backend_url: str,
+    extract_slots: asyncio.Semaphore,
+    ocr_text: str | None = None,
+) -> BatchRecord:
+    """Read one label and extract its plant care details.
+
+    Args:
+        image_path: The path of the label photo.
+        pool: The OCR worker processes.
+        client: The backend client, or None to skip the extraction.
+        backend_url: The backend /extract endpoint.
+        extract_slots: Limits the extraction requests in flight.
+        ocr_text: The label text read by a previous run, which skips the OCR.
+
+    Returns:
+        The record for the output file. Failures are recorded rather than raised
+        so one bad photo does not stop the batch.
+    """
+    record: BatchRecord = {
+        "image": str(image_path),
+        "ocr_text": ocr_text,
+        "care": None,
+        "error": None,
+        "ocr_seconds": 0.0,
+        "extract_seconds": 0.0,
+    }
+    if ocr_text is None:
+        loop = asyncio.get_running_loop()
+        try:
+            record["ocr_text"], record["ocr_seconds"] = await loop.run_in_executor(
+                pool, read_label_text, str(image_path)
+            )
+        # Any OCR error is recorded so one bad photo does not stop the batch.
+        except Exception as e:  # noqa: BLE001
+            record["error"] = f"OCR failed: {e}"
+            return record
+    if record["ocr_text"] is None:
+        record["error"] = "Could not read the label text."
+        return record
+    if client is None:
+        return record
+    async with extract_slots:
+        start = time.perf_counter()
+        try:
+            record["care"] = await extract_care(client, backend_url, record["ocr_text"])
+        except (httpx.HTTPError, ValueError) as e:
+            # A ValueError is a response body that is not JSON.
+            record["error"] = f"Extraction failed: {e}"
+        record["extract_seconds"] = time.perf_counter() - start
+    return record
+
+
+async def run_batch(args: argparse.Namespace) -> BatchStats:
+    """Process every unfinished image in the directory."""
+    output: Path = args.output
+    finished, read_texts = load_finished(output, args.retry_failed, args.ocr_only)
+    images = [path for path in find_images(args.directory) if str(path) not in finished]
+    print(
+        f"{len(images)} images to process, {len(finished)} already done and "
+        f"{len(read_texts)} with their label text already read"
+    )
+    stats = BatchStats(len(images))
+    if not images:
+        return stats
+    extract_slots = asyncio.Semaphore(args.concurrency)
+    client = None
+    if not args.ocr_only:
+        client = httpx.AsyncClient(
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    end_partial_line(output)
+    last_progress = time.perf_counter()
+    try:
+        with (
+            ProcessPoolExecutor(max_workers=args.workers) as pool,
+            output.open("a", encoding="utf-8") as f,
+        ):
+            tasks = [
+                asyncio.create_task(
+                    process_image(
+                        path,
+                        pool,
+                        client,
+                        args.backend_url,
+                        extract_slots,
+                        read_texts.get(str(path)),
+                    )
+                )
+                for path in images
+            ]
+            for task in asyncio.as_completed(tasks):
+                record = await task
+                f.write(json.dumps(record) + "\n")
+                # Flushed per image so an interrupted run loses at most one record.
+                f.flush()
+                stats.add(record)
+                if time.perf_counter() - last_progress >= PROGRESS_INTERVAL:
+                    print(stats.summary())
+                    last_progress = time.perf_counter()
+    finally:
+        if client is not None:
+            await client.aclose()
+    return stats
+
+
+def write_parquet(jsonl_path: Path, parquet_path: Path) -> None:
+    """Convert the JSONL results to a Parquet file.
+
+    Raises:
+        SystemExit: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit(
+            "Writing Parquet needs pyarrow: pip install 'forgetful-gardner[parquet]'"
+        )
+    records: dict[str, dict] = {}
+    with jsonl_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            # A retried image has a later line that replaces the failed one.
+            records[record["image"]] = record
+    for record in records.values():
+        # Nested care details vary between labels, so they are kept as JSON text.
+        record["care"] = json.dumps(record["care"]) if record["care"] else None
+    pq.write_table(pa.Table.from_pylist(list(records.values())), parquet_path)
+
+
+def batch(args: argparse.Namespace) -> None:
+    """Run the batch command."""
+    if not args.directory.is_dir():
+        raise SystemExit(f"Not a directory: {args.directory}")
+    stats = asyncio.run(run_batch(args))
+    print(stats.summary())
+    if args.parquet is not None:
+        write_parquet(args.output, args.parquet)
+        print(f"Wrote {args.parquet}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(prog="forgetful-gardner")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch_parser = commands.add_parser(
+        "batch", help="read a folder of label photos and extract their plant care"
+    )
+    batch_parser.add_argument("directory", type=Path)
+    batch_parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("plant_care.jsonl"),
+        help="JSONL file the results are appended to, and resumed from. A retried "
+        "image gets a new line, and the last line for an image is its result",
+    )
+    batch_parser.add_argument(
+        "--parquet", type=Path, help="also write the results to this Parquet file"
+    )
+    batch_parser.add_argument(
+        "--backend-url",
+        default=os.getenv("BACKEND_URL", DEFAULT_BACKEND_URL),
+        help="the backend /extract endpoint",
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="OCR worker processes",
+    )
+    batch_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="extraction requests in flight at once",
+    )
+    batch_parser.add_argument(
+        "--timeout", type=float, default=120.0, help="seconds per extraction request"
+    )
+    batch_parser.add_argument(
+        "--ocr-only", action="store_true", help="skip the extraction requests"
+    )
+    batch_parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="process images that failed in a previous run again",
+    )
+    batch_parser.set_defaults(func=batch)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the command line tools."""
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
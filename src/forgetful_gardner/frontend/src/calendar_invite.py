@@ -0,0 +1,120 @@
+"""Recurrence rules, start dates and iCalendar files for the plant care reminders."""
+
+import uuid
+from datetime import UTC, date, datetime, timedelta
+from functools import lru_cache
+
+# The reminder recurrence for each watering frequency.
+CALENDAR_RECURRENCES = {
+    "Weekly": "RRULE:FREQ=WEEKLY;INTERVAL=1;WKST=MO;BYDAY=WE",
+    "Fortnightly": "RRULE:FREQ=WEEKLY;INTERVAL=2;WKST=MO;BYDAY=WE",
+    "Monthly": "RRULE:FREQ=MONTHLY;INTERVAL=1;WKST=MO;BYDAY=WE",
+}
+DEFAULT_RECURRENCE = "RRULE:FREQ=WEEKLY;INTERVAL=1;WKST=MO;BYDAY=WE,FR"
+# iCalendar lines longer than this many octets are folded.
+ICS_LINE_LENGTH = 75
+
+
+def get_recurrence(watering_frequency: str | None) -> str:
+    """Get the reminder recurrence rule for the watering frequency."""
+    return CALENDAR_RECURRENCES.get(watering_frequency, DEFAULT_RECURRENCE)
+
+
+@lru_cache(maxsize=1)
+def get_next_wednesday(today: date) -> date:
+    """Get the first Wednesday after today.
+
+    Cached on the date, so it is only worked out again when the day changes.
+    """
+    # Wednesday is represented by 2, and Monday by 0
+    days_until_wednesday = (2 - today.weekday() + 7) % 7
+
+    # If today is Wednesday, and we want the *next* Wednesday, add 7 days
+    if days_until_wednesday == 0:
+        days_until_wednesday = 7
+    return today + timedelta(days=days_until_wednesday)
+
+
+def get_start_date() -> date:
+    """Get the start date of a reminder created now."""
+    return get_next_wednesday(date.today())
+
+
+def escape_ics_text(text: str) -> str:
+    """Escape a value for an iCalendar text property."""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_ics_line(line: str) -> str:
+    """Fold a content line so no line is longer than 75 octets.
+
+    The continuation lines start with a space, and multi-byte characters are not
+    split.
+    """
+    if len(line.encode("utf-8")) <= ICS_LINE_LENGTH:
+        return line
+    parts, part, size = [], "", 0
+    for character in line:
+        width = len(character.encode("utf-8"))
+        if size + width > ICS_LINE_LENGTH:
+            parts.append(part)
+            # The leading space of the continuation line counts towards its length.
+            part, size = " ", 1
+        part += character
+        size += width
+    parts.append(part)
+    return "\r\n".join(parts)
+
+
+def build_ics(
+    name: str,
+    watering_frequency: str | None,
+    fertiliser: list[str],
+    image_text: str = "",
+    start_date: date | None = None,
+) -> str:
+    """Build an iCalendar file with the recurring plant care reminder.
+
+    Args:
+        name: The plant name.
+        watering_frequency: The watering frequency, which sets the recurrence.
+        fertiliser: The fertiliser schedule.
+        image_text: The label text, added to the description.
+        start_date: The date of the first reminder. The next Wednesday when None.
+
+    Returns:
+        The calendar, with CRLF line endings.
+    """
+    start_date = start_date or get_start_date()
+    description_lines = []
+    if fertiliser:
+        description_lines.append(
+            f"Fertilise your {name} plant as per schedule: {', '.join(fertiliser)}."
+        )
+    if image_text:
+        description_lines.append(image_text)
+    description = "\n".join(description_lines)
+    summary = f"[Reminder] Water and Fertilise your {name} plant"
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Forgetful Gardener//Plant care reminders//EN",
+        "BEGIN:VEVENT",
+        f"UID:{uuid.uuid4()}@forgetful-gardener",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{start_date:%Y%m%d}",
+        f"SUMMARY:{escape_ics_text(summary)}",
+        "LOCATION:Garden",
+        f"DESCRIPTION:{escape_ics_text(description)}",
+        get_recurrence(watering_frequency),
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    return "".join(fold_ics_line(line) + "\r\n" for line in lines)
@@ -0,0 +1,203 @@
+"""An in-process job queue for uploads that are processed after the response.
+
+The upload request returns as soon as the photo is queued. A fixed number of worker
+tasks read the queued photos, and the browser polls or subscribes for the result,
+so no connection is held open through OCR and the model call.
+"""
+
+import asyncio
+import contextvars
+import os
+import secrets
+import time
+from collections.abc import Awaitable, Buffer, Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import TypedDict
+
+
+class JobStatus(StrEnum):
+    """The state of a job."""
+
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the job queue is full."""
+
+
+class JobQueueStats(TypedDict):
+    """The job queue counters."""
+
+    queued: int
+    running: int
+    stored: int
+    workers: int
+    max_queue_size: int
+    completed: int
+    failed: int
+    rejected: int
+    mean_wait_seconds: float
+    mean_run_seconds: float
+
+
+@dataclass
+class Job:
+    """An upload waiting for, or processed by, a worker."""
+
+    id: str
+    filename: str
+    created_at: float = field(default_factory=time.monotonic)
+    status: JobStatus = JobStatus.queued
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: str | None = None
+    error: str | None = None
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+    # The context of the upload request, so the job's spans join its trace.
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class JobQueue:
+    """Process uploads with a pool of worker tasks fed by a bounded queue.
+
+    Finished jobs are kept for ttl seconds so their result can be collected.
+
+    Args:
+        handler: Turns the image data and file name into the result html.
+        max_workers: The number of jobs processed at the same time.
+        max_queue_size: The number of jobs allowed to wait for a worker.
+        ttl: The number of seconds a finished job is kept.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Buffer, str], Awaitable[str]],
+        max_workers: int = 2,
+        max_queue_size: int = 32,
+        ttl: float = 600.0,
+    ):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.ttl = ttl
+        self._jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue[tuple[Job, Buffer]] | None = None
+        self._workers: list[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    @classmethod
+    def from_env(cls, handler: Callable[[Buffer, str], Awaitable[str]]) -> "JobQueue":
+        """Create a job queue configured with environment variables."""
+        return cls(
+            handler,
+            max_workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_queue_size=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+            ttl=float(os.getenv("JOB_TTL", "600")),
+        )
+
+    @property
+    def stats(self) -> JobQueueStats:
+        """The queue depth, the job counters and the mean job timings."""
+        finished = self.completed + self.failed
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(
+                job.status == JobStatus.running for job in self._jobs.values()
+            ),
+            "stored": len(self._jobs),
+            "workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "mean_wait_seconds": self._total_wait / finished if finished else 0.0,
+            "mean_run_seconds": self._total_run / finished if finished else 0.0,
+        }
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.max_workers)
+        ]
+
+    async def close(self) -> None:
+        """Stop the workers, abandoning the queued jobs."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def submit(self, image_bytes: Buffer, filename: str) -> Job:
+        """Queue an upload.
+
+        The queue keeps a reference to the photo data read from the upload, which
+        stays valid after the request's temporary file is closed.
+
+        Args:
+            image_bytes: The uploaded image.
+            filename: The uploaded file name, used in error messages.
+
+        Returns:
+            The queued job.
+
+        Raises:
+            JobQueueFullError: If the queue already has the maximum number of jobs.
+        """
+        self.start()
+        self._prune()
+        job = Job(id=secrets.token_urlsafe(16), filename=filename)
+        try:
+            self._queue.put_nowait((job, image_bytes))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise JobQueueFullError(
+                "The server is busy processing other images. Please try again shortly."
+            )
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Get a job by id, or None if it is unknown or has expired."""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.ttl:
+                del self._jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            job, image_bytes = await self._queue.get()
+            job.status = JobStatus.running
+            job.started_at = time.monotonic()
+            try:
+                job.result = await asyncio.create_task(
+                    self.handler(image_bytes, job.filename), context=job.context
+                )
+                job.status = JobStatus.done
+                self.completed += 1
+            # Any failure is kept on the job for the page to show.
+            except Exception as e:  # noqa: BLE001
+                job.error = str(e)
+                job.status = JobStatus.failed
+                self.failed += 1
+            finally:
+                job.finished_at = time.monotonic()
+                self._total_wait += job.started_at - job.created_at
+                self._total_run += job.finished_at - job.started_at
+                job.finished.set()
+                self._queue.task_done()
@@ -1,27 +1,67 @@
+import html
+import json
+import logging
 import os
+import secrets
+import time
+import traceback
+from collections.abc import AsyncIterator, Buffer
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime, timedelta
+from typing import Annotated
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, UploadFile, File, Request
-from fastapi.responses import HTMLResponse
+import httpx
+from fastapi import FastAPI, File, Query, Request, UploadFile
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import httpx
 from httpx import HTTPStatusError
-import html
-from jinja2 import Template
-
-import traceback
-import logging
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 logger = logging.getLogger(__name__)
 
+from calendar_invite import build_ics, get_recurrence, get_start_date
+from http_client import create_async_client
+from jobs import Job, JobQueue, JobQueueFullError, JobStatus
 from processing_labels.garden_label_processor import (
     get_plant_care_text_from_image_bytes,
 )
+from processing_labels.image_processor.image_processor import (
+    OCR_MAX_LONG_SIDE,
+    get_ocr_config_fingerprint,
+    orientation_stats,
+)
+from processing_labels.metrics import in_progress, register_stats, stage_timer
+from processing_labels.ocr_cache import (
+    OCRResultCache,
+    image_cache_key,
+    perceptual_cache_key,
+)
+from processing_labels.ocr_worker_pool import OCRWorkerPool, WorkerPoolFullError
+from processing_labels.tracing import configure_tracing, trace_request
+from sse import format_sse, iter_sse_events
+from uploads import UploadTooLargeError, read_upload
+
+configure_tracing("frontend")
+ocr_pool = OCRWorkerPool.from_env()
+ocr_cache = OCRResultCache.from_env(config=get_ocr_config_fingerprint())
+backend_client = create_async_client("BACKEND", timeout=60.0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ocr_pool.start()
+    job_queue.start()
+    yield
+    await job_queue.close()
+    ocr_pool.shutdown()
+    ocr_cache.close()
+    await backend_client.aclose()
+
 
 # I used an LLM to come up with the skeleton code for using FastAPI and JINJA template
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 TEMPLATES_DIR = Path("/home/forgetful_gardner/src/templates")
 app.mount(
@@ -30,173 +70,402 @@ app.mount(
     name="static",
 )
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
+# Compiled once, with the macros it imports, rather than on every response.
+result_template = templates.get_template("partials/result.html")
 
 GARDEN_LABEL_PROCESSOR_URL = os.environ["BACKEND_URL"]
+GARDEN_LABEL_PROCESSOR_STREAM_URL = os.getenv(
+    "BACKEND_STREAM_URL", GARDEN_LABEL_PROCESSOR_URL + "/stream"
+)
+UPLOAD_STREAMING = os.getenv("UPLOAD_STREAMING", "1") == "1"
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Room for the multipart boundaries and headers around the photo.
+MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_PATHS = ("/upload", "/upload/stream")
+# Queue uploads and return at once, rather than holding the request open.
+UPLOAD_JOBS = os.getenv("UPLOAD_JOBS", "0") == "1"
+# "poll" checks /jobs/{id} every JOB_POLL_INTERVAL seconds, "sse" waits on an event.
+JOB_UPDATES = os.getenv("JOB_UPDATES", "poll")
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# Set to "0" to offer an .ics download instead of the add-to-calendar-button widget.
+CALENDAR_WIDGET = os.getenv("CALENDAR_WIDGET", "1") == "1"
+# Seconds the browser has to open the event stream after the label is read.
+PENDING_STREAM_TTL = 60.0
+pending_streams: dict[str, tuple[float, str]] = {}
+
+
+def upload_too_large_response() -> HTMLResponse:
+    """The response for an upload over the size limit."""
+    limit_mb = MAX_UPLOAD_BYTES / (1024 * 1024)
+    return HTMLResponse(
+        f'<div class="error">The photo is too large. Please upload a photo under '
+        f"{limit_mb:.3g} MB.</div>",
+        status_code=413,
+    )
+
+
+@app.middleware("http")
+async def time_uploads(request: Request, call_next):
+    """Time the upload requests and count the ones in progress."""
+    if request.url.path not in UPLOAD_PATHS:
+        return await call_next(request)
+    with in_progress.labels(stage="upload").track_inprogress(), stage_timer("upload"):
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject uploads over the size limit before their body is read."""
+    content_length = request.headers.get("content-length")
+    if (
+        request.method == "POST"
+        and request.url.path in UPLOAD_PATHS
+        and content_length is not None
+        and content_length.isdigit()
+        and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+    ):
+        return upload_too_large_response()
+    return await call_next(request)
+
+
+# Added last so it is the outermost middleware and its span covers the others.
+app.middleware("http")(trace_request)
 
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    upload_url = "/upload/stream" if UPLOAD_STREAMING and not UPLOAD_JOBS else "/upload"
+    return templates.TemplateResponse(
+        "index.html",
+        {
+            "request": request,
+            "upload_url": upload_url,
+            "calendar_widget": CALENDAR_WIDGET,
+            "upload_max_long_side": OCR_MAX_LONG_SIDE,
+        },
+    )
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "ocr_cache": ocr_cache.stats,
+        "ocr_pool": {"pending": ocr_pool.pending, "workers": ocr_pool.max_workers},
+        "orientation": orientation_stats,
+        "jobs": job_queue.stats,
+    }
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Expose the stage timings and counters in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+async def read_label_text(image_bytes: Buffer) -> list[str] | None:
+    """Get the label text, using the OCR cache before running the OCR pipeline.
+
+    Args:
+        image_bytes: The uploaded image.
+
+    Returns:
+        The label text lines.
+    """
+    cache_keys = [image_cache_key(image_bytes)]
+    image_text_list = ocr_cache.get(
+        cache_keys, count_miss=not ocr_cache.use_perceptual_hash
+    )
+    if image_text_list is None and ocr_cache.use_perceptual_hash:
+        perceptual_key = await ocr_pool.run(perceptual_cache_key, image_bytes)
+        if perceptual_key is not None:
+            cache_keys.append(perceptual_key)
+        image_text_list = ocr_cache.get(cache_keys)
+    if image_text_list is not None:
+        return image_text_list
+    image_text_list = await ocr_pool.run(
+        get_plant_care_text_from_image_bytes, image_bytes
+    )
+    if image_text_list is not None:
+        ocr_cache.put(cache_keys, image_text_list)
+    return image_text_list
+
+
+async def get_upload_html(image_bytes: Buffer, filename: str) -> str:
+    """Read the label, extract the care details and render the result.
+
+    Args:
+        image_bytes: The uploaded image.
+        filename: The uploaded file name.
+
+    Returns:
+        The result html, or an error message.
+
+    Raises:
+        WorkerPoolFullError: If the OCR worker pool is full.
+    """
+    try:
+        image_text_list = await read_label_text(image_bytes)
+        if image_text_list is None:
+            raise RuntimeError(f"Could not process image: {filename}")
+        else:
+            print("Processing Image")
+            logger.info("Processing Image")
+            image_text = "\n".join(image_text_list)
+            with stage_timer("extract"):
+                response = await backend_client.post(
+                    GARDEN_LABEL_PROCESSOR_URL,
+                    json={"ocr_text": image_text},
+                )
+            response.raise_for_status()
+            result = response.json()
+            return render_result(result, image_text)
+    except WorkerPoolFullError:
+        raise
+    except httpx.TimeoutException:
+        return """
+            <div class="error">The backend took too long to respond. Please try again later.</div>
+        """
+    except HTTPStatusError as e:
+        detail = e.response.json().get("detail", {})
+        error_msg = detail.get("error", "Unknown backend error")
+        return f"""
+            <div class="error">{error_msg}</div>
+        """
+
+    # Any other failure is shown on the page rather than as a server error.
+    except Exception as e:  # noqa: BLE001
+        print(e)
+        return f"""
+        <div class="error">{e} Try again.</div>
+    """
+
+
+job_queue = JobQueue.from_env(get_upload_html)
+
+register_stats(
+    "ocr_cache",
+    lambda: ocr_cache.stats,
+    counters=("memory_hits", "disk_hits", "perceptual_hits", "misses"),
+)
+register_stats(
+    "ocr_pool", lambda: {"pending": ocr_pool.pending, "workers": ocr_pool.max_workers}
+)
+register_stats("orientation", lambda: orientation_stats, counters=("estimated", "osd"))
+register_stats(
+    "jobs", lambda: job_queue.stats, counters=("completed", "failed", "rejected")
+)
 
 
 @app.post("/upload", response_class=HTMLResponse)
-async def upload(file: UploadFile = File(...)):
+async def upload(file: Annotated[UploadFile, File()]):
     # Forward the file to another backend
-    async with httpx.AsyncClient() as client:
-        image_bytes = await file.read()
-        try:
-            image_text_list = get_plant_care_text_from_image_bytes(image_bytes)
-            if image_text_list is None:
-                raise RuntimeError(f"Could not process image: {file.filename}")
-            else:
-                print("Processing Image")
-                logger.info("Processing Image")
-                image_text = "\n".join(image_text_list)
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        GARDEN_LABEL_PROCESSOR_URL,
-                        json={"ocr_text": image_text},
-                        timeout=60.0,
-                    )
-                    response.raise_for_status()
-                result = response.json()
-                # Set up start date for calendar event
-                start_date = get_next_wednesday().strftime("%Y-%m-%d")
-                # set calendar frequency
-                match result["watering_frequency"]:
-                    case "Weekly":
-                        calendar_recurrence = (
-                            "RRULE:FREQ=WEEKLY;INTERVAL=1;WKST=MO;BYDAY=WE"
-                        )
-                    case "Fortnightly":
-                        calendar_recurrence = (
-                            "RRULE:FREQ=WEEKLY;INTERVAL=2,;WKST=MO;BYDAY=WE"
-                        )
-                    case "Monthly":
-                        calendar_recurrence = (
-                            "RRULE:FREQ=MONTHLY;INTERVAL=1,;WKST=MO;BYDAY=WE"
-                        )
-                    case _:
-                        calendar_recurrence = (
-                            "RRULE:FREQ=WEEKLY;INTERVAL=1;WKST=MO;BYDAY=WE,FR;"
-                        )
-
-                if result["fertiliser"]:
-                    template_str = """
-                        <div class="success container d-flex col-sm">
-                            <div class="calendar-button row g-1">
-                                <div class="col-md">
-                                    <add-to-calendar-button
-                                        name="[Reminder] Water and Fertilise your {{ result.name }} plant"
-                                        startDate={{ start_date }}
-                                        timeZone="currentBrowser"
-                                        location="Garden"
-                                        description="Fertiliser your {{ result.name }} plant as per schedule:{{', '.join(result.fertiliser)}}.<br>{{image_text}}</br>"
-                                        options="'Apple','Google','iCal','Outlook.com','Yahoo'"
-                                        recurrence="{{ calendar_recurrence }}"
-                                        lightMode="bodyScheme"
-                                        buttonStyle="date"
-                                        >
-                                    </add-to-calendar-button>
-                                    </div>
-                                <div class="col-md result-values mx-5">
-                                    <ul>
-                                        <li><strong> Plant Name: </strong> {{ result.name }}</li>
-                                            <li> <strong>Watering Frequency: </strong> {{ result.watering_frequency }}</li>
-                                            <li><strong>Fertiliser Schedule:</strong>
-                                            <ul class="fertiliser">
-                                                {% for item in result.fertiliser %}
-                                                <li>{{ item }}</li>
-                                                {% endfor %}
-                                            </ul>
-                                            </li>
-                                    </ul>
-                                </div>
-                            </div>               
-                        </div>
-                        """
-                    template = Template(template_str)
-                    rendered_html = template.render(
-                        result=result,
-                        calendar_recurrence=calendar_recurrence,
-                        start_date=start_date,
-                        image_text=image_text,
-                    )
-                else:
-                    template_str = """
-                        <div class="success container d-flex col-sm">
-                            <div class="calendar-button row g-1">
-                                <div class="col-md">
-                                    <add-to-calendar-button
-                                        name="[Reminder] Water and Fertilise your {{ result.name }} plant"
-                                        startDate={{ start_date }}
-                                        timeZone="currentBrowser"
-                                        location="Garden"
-                                        description="<br>{{image_text}}</br>"
-                                        options="'Apple','Google','iCal','Outlook.com','Yahoo'"
-                                        recurrence="{{ calendar_recurrence }}"
-                                        lightMode="bodyScheme"
-                                        buttonStyle="date"
-                                        >
-                                    </add-to-calendar-button>
-                                    </div>
-                                <div class="col-md result-values mx-5">
-                                    <ul>
-                                        <li><strong> Plant Name: </strong> {{ result.name }}</li>
-                                            <li> <strong>Watering Frequency: </strong> {{ result.watering_frequency }}</li>
-                                    </ul>
-                                </div>
-                            </div>               
-                        </div>
-                        """
-                    template = Template(template_str)
-                    rendered_html = template.render(
-                        result=result,
-                        calendar_recurrence=calendar_recurrence,
-                        start_date=start_date,
-                        image_text=image_text,
-                    )
-            return HTMLResponse(rendered_html)
-        except httpx.TimeoutException:
-            return HTMLResponse(
-                """
-                <div class="error">The backend took too long to respond. Please try again later.</div>
-            """
-            )
-        except HTTPStatusError as e:
-            detail = e.response.json().get("detail", {})
-            error_msg = detail.get("error", "Unknown backend error")
+    try:
+        image_bytes = await read_upload(file, MAX_UPLOAD_BYTES)
+        if UPLOAD_JOBS:
+            job = job_queue.submit(image_bytes, file.filename)
             return HTMLResponse(
-                f"""
-                <div class="error">{error_msg}</div>
-            """
+                render_job(job),
+                status_code=202,
+                headers={"Location": f"/jobs/{job.id}"},
             )
+        return HTMLResponse(await get_upload_html(image_bytes, file.filename))
+    except UploadTooLargeError:
+        return upload_too_large_response()
+    except (WorkerPoolFullError, JobQueueFullError) as e:
+        return HTMLResponse(
+            f"""
+            <div class="error">{e}</div>
+        """,
+            status_code=503,
+            headers={"Retry-After": "5"},
+        )
 
-        except Exception as e:
-            print(e)
-            return HTMLResponse(
-                f"""
-            <div class="error">{e} Try again.</div>
-        """
-            )
+
+def render_job(job: Job) -> str:
+    """Render the result of a finished job, or a fragment that waits for it."""
+    match job.status:
+        case JobStatus.done:
+            return job.result
+        case JobStatus.failed:
+            return f'<div class="error">{html.escape(job.error)} Try again.</div>'
+    job_template = templates.get_template("partials/job_pending.html")
+    return job_template.render(
+        job=job, updates=JOB_UPDATES, poll_interval=JOB_POLL_INTERVAL
+    )
+
+
+@app.get("/jobs/{job_id}", response_class=HTMLResponse)
+async def get_job(job_id: str):
+    """Get the result of an upload job, or a fragment that keeps polling for it."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return HTMLResponse(
+            '<div class="error">Upload expired. Try again.</div>', status_code=404
+        )
+    return HTMLResponse(render_job(job))
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    """Send the result of an upload job as a server-sent event once it finishes."""
+    job = job_queue.get(job_id)
+
+    async def events() -> AsyncIterator[str]:
+        if job is None:
+            error_html = '<div class="error">Upload expired. Try again.</div>'
+            yield format_sse("result", error_html)
+            return
+        await job.finished.wait()
+        yield format_sse("result", render_job(job))
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@stage_timer("render")
+def render_result(result: dict, image_text: str) -> str:
+    """Render the calendar invite and care details for the plant care result.
+
+    Args:
+        result: The plant care result from the backend.
+        image_text: The label text.
+
+    Returns:
+        The result html.
+    """
+    ics_query = urlencode(
+        {
+            "name": result["name"] or "",
+            "watering_frequency": result["watering_frequency"] or "",
+            "fertiliser": result["fertiliser"] or [],
+            "text": image_text,
+        },
+        doseq=True,
+    )
+    return result_template.render(
+        result=result,
+        calendar_recurrence=get_recurrence(result["watering_frequency"]),
+        start_date=get_start_date().isoformat(),
+        image_text=image_text,
+        ics_url=f"/calendar.ics?{ics_query}",
+        use_widget=CALENDAR_WIDGET,
+    )
+
+
+@app.get("/calendar.ics")
+async def calendar_file(
+    name: str = "",
+    watering_frequency: str | None = None,
+    fertiliser: Annotated[list[str] | None, Query()] = None,
+    text: str = "",
+) -> Response:
+    """Download the plant care reminder as an iCalendar file."""
+    return Response(
+        build_ics(name, watering_frequency, fertiliser or [], text),
+        media_type="text/calendar",
+        headers={"Content-Disposition": 'attachment; filename="plant_care.ics"'},
+    )
+
+
+@app.post("/upload/stream", response_class=HTMLResponse)
+async def upload_stream(file: Annotated[UploadFile, File()]):
+    """Read the label and return a fragment that streams in the care details."""
+    try:
+        image_bytes = await read_upload(file, MAX_UPLOAD_BYTES)
+        image_text_list = await read_label_text(image_bytes)
+        if image_text_list is None:
+            raise RuntimeError(f"Could not process image: {file.filename}")
+    except UploadTooLargeError:
+        return upload_too_large_response()
+    except WorkerPoolFullError as e:
+        return HTMLResponse(
+            f"""
+            <div class="error">{e}</div>
+        """,
+            status_code=503,
+            headers={"Retry-After": "5"},
+        )
+    # Any other failure is shown on the page rather than as a server error.
+    except Exception as e:  # noqa: BLE001
+        print(e)
+        return HTMLResponse(
+            f"""
+        <div class="error">{html.escape(str(e))} Try again.</div>
+    """
+        )
+    now = time.monotonic()
+    for token, (created_at, _) in list(pending_streams.items()):
+        if now - created_at > PENDING_STREAM_TTL:
+            del pending_streams[token]
+    token = secrets.token_urlsafe(16)
+    pending_streams[token] = (now, "\n".join(image_text_list))
+    streaming_template = templates.get_template("partials/streaming_result.html")
+    return HTMLResponse(streaming_template.render(token=token))
+
+
+@app.get("/upload/stream/{token}")
+async def upload_stream_events(token: str) -> StreamingResponse:
+    """Stream the care details of a read label as server-sent events."""
+    pending = pending_streams.pop(token, None)
+    if pending is None:
+        error_html = '<div class="error">Upload expired. Try again.</div>'
+        events = iter([format_sse("result", error_html)])
+    else:
+        events = stream_result_events(pending[1])
+    return StreamingResponse(events, media_type="text/event-stream")
 
 
-def get_next_wednesday():
-    # Get the current date and time
-    now = datetime.now()
+def render_field(field: str, value) -> str:
+    """Render a single plant care field for the streamed result."""
+    if field == "fertiliser":
+        return "".join(f"<li>{html.escape(str(item))}</li>" for item in value or [])
+    return html.escape(str(value or ""))
 
-    # Get the current day of the week (Monday is 0, Sunday is 6)
-    current_weekday = now.weekday()
 
-    # Calculate the number of days until the next Wednesday
-    # Wednesday is represented by 2
-    days_until_wednesday = (2 - current_weekday + 7) % 7
+async def stream_result_events(image_text: str) -> AsyncIterator[str]:
+    """Relay the backend's plant care events as rendered html events.
 
-    # If today is Wednesday, and we want the *next* Wednesday, add 7 days
-    if days_until_wednesday == 0:
-        days_until_wednesday = 7
+    Each field is sent as an event named after the field as soon as the backend
+    has it. The "result" event replaces the streamed fragment with the calendar
+    invite, or with an error message.
 
-    # Add the calculated days to the current date
-    next_wednesday = now + timedelta(days=days_until_wednesday)
+    Args:
+        image_text: The label text.
 
-    return next_wednesday
+    Yields:
+        The server-sent events.
+    """
+    try:
+        with stage_timer("extract"):
+            async with backend_client.stream(
+                "POST", GARDEN_LABEL_PROCESSOR_STREAM_URL, json={"ocr_text": image_text}
+            ) as response:
+                response.raise_for_status()
+                async for event, data in iter_sse_events(response):
+                    match event:
+                        case "field":
+                            for field, value in json.loads(data).items():
+                                yield format_sse(field, render_field(field, value))
+                        case "result":
+                            result = json.loads(data)
+                            result_html = render_result(result, image_text)
+                            yield format_sse("result", result_html)
+                            return
+                        case "error":
+                            error = json.loads(data).get(
+                                "error", "Unknown backend error"
+                            )
+                            error_html = (
+                                f'<div class="error">{html.escape(error)}</div>'
+                            )
+                            yield format_sse("result", error_html)
+                            return
+    except httpx.TimeoutException:
+        yield format_sse(
+            "result",
+            '<div class="error">The backend took too long to respond. '
+            "Please try again later.</div>",
+        )
+    except httpx.HTTPError as e:
+        yield format_sse(
+            "result", f'<div class="error">{html.escape(str(e))} Try again.</div>'
+        )
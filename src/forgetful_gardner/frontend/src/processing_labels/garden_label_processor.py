@@ -1,11 +1,12 @@
+from collections.abc import Buffer
 from enum import StrEnum
 from pathlib import Path
-from typing import TypedDict, Required, NotRequired, Optional
+from typing import NotRequired, Required, TypedDict
 
 import cv2
-import numpy as np
 
-from .image_processor.image_processor import process_image
+from .image_processor.image_processor import OCR_MAX_LONG_SIDE, process_image
+from .image_processor.image_utils import decode_image
 
 
 class SoilType(StrEnum):
@@ -42,7 +43,7 @@ class PlantCare(TypedDict, total=False):
     soil: NotRequired[SoilType]
 
 
-def get_plant_care_text(image_file_path: Path | str) -> Optional[list[str]]:
+def get_plant_care_text(image_file_path: Path | str) -> list[str] | None:
     """Get the plant care text from a given image.
 
     Args:
@@ -63,7 +64,7 @@ def get_plant_care_text(image_file_path: Path | str) -> Optional[list[str]]:
 
 
 # I used an LLM to help me turn the get plant care text to one that can process image bytes
-def get_plant_care_text_from_image_bytes(image_bytes: bytes) -> Optional[list[str]]:
+def get_plant_care_text_from_image_bytes(image_bytes: Buffer) -> list[str] | None:
     """Get the plant care text from a given image.
 
     Args:
@@ -72,8 +73,7 @@ def get_plant_care_text_from_image_bytes(image_bytes: bytes) -> Optional[list[st
     Returns:
         A string representing the text from the image.
     """
-    np_array = np.frombuffer(image_bytes, np.uint8)
-    image = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
+    image = decode_image(image_bytes, OCR_MAX_LONG_SIDE)
     if image is None:
         raise ValueError("Invalid image data")
     image_text_list = None
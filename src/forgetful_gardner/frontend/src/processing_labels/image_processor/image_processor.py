@@ -1,27 +1,52 @@
-from typing import Optional
+import hashlib
+import json
+import os
+from functools import partial
 
 import cv2
+from opentelemetry import trace
 from pytesseract.pytesseract import TesseractError
 
-
+from ..metrics import stage_timer
+from . import image_reader
+from .image_reader import get_image_orientation
 from .image_utils import (
-    get_grayscale,
-    thresholding,
-    opening,
-    rotate_image,
+    PreprocessingPipeline,
     RotateFlags,
+    downscale_to_long_side,
+    rotate_by_angle,
+    rotate_image,
 )
-from .image_reader import (
-    get_image_orientation,
-    analyse_image_quality_text,
-)
+from .ocr_strategies import OCR_STRATEGIES, OCR_STRATEGY_MODE, read_with_strategies
+from .orientation import estimate_orientation
+from .text_regions import select_text_regions
+
+# The long side images are shrunk to before any processing. 0 keeps full resolution.
+OCR_MAX_LONG_SIDE = int(os.getenv("OCR_MAX_LONG_SIDE", "2000"))
+preprocessing_pipeline = PreprocessingPipeline()
+# The orientation estimate is trusted above this confidence, otherwise OSD is run.
+OCR_ORIENTATION_CONFIDENCE = float(os.getenv("OCR_ORIENTATION_CONFIDENCE", "0.5"))
+# Skew angles smaller than this many degrees are left alone.
+MIN_SKEW_ANGLE = 0.5
+# Crop to the detected text blocks and read them in parallel instead of the whole photo.
+OCR_TEXT_REGIONS = os.getenv("OCR_TEXT_REGIONS", "0") == "1"
+orientation_stats = {"estimated": 0, "osd": 0}
+# Bump when a change to the pipeline changes the text read from the same settings.
+OCR_PIPELINE_VERSION = 1
 
 
-def process_image(image: cv2.typing.MatLike) -> list[str]:
+@stage_timer("process_image")
+def process_image(
+    image: cv2.typing.MatLike,
+    max_long_side: int = OCR_MAX_LONG_SIDE,
+    text_regions: bool = OCR_TEXT_REGIONS,
+) -> list[str]:
     """Process the image to prepare for reading.
 
     Args:
         image: An image to be processed.
+        max_long_side: The long side in pixels the image is shrunk to first.
+        text_regions: Whether to read only the detected text blocks.
 
     Returns:
         A string representing the text from the image.
@@ -29,24 +54,17 @@ def process_image(image: cv2.typing.MatLike) -> list[str]:
     Raises:
         ValueError: If the image cannot be processed or read.
     """
-    denoise = opening(image)
-    grayed = get_grayscale(denoise)
-    thresh = thresholding(grayed)
-    image_text: str = ""
-    cv2_rotation: Optional[RotateFlags] = determine_image_rotation(thresh)
-    if cv2_rotation is not None:
-        image_to_read = rotate_image(thresh, cv2_rotation)
-    else:
-        image_to_read = thresh
-    # Attempt default config read and check quality.
-    try:
-        image_text = analyse_image_quality_text(image_to_read)
-    except ValueError:
-        # If the default config read fails, try a more lenient config.
-        try:
-            image_text = analyse_image_quality_text(image_to_read, config=r"--psm 1")
-        except ValueError:
-            raise
+    image = downscale_to_long_side(image, max_long_side)
+    thresh = preprocessing_pipeline.run(image)
+    cv2_rotation, skew_angle = find_orientation(thresh)
+    orient = partial(
+        apply_orientation, cv2_rotation=cv2_rotation, skew_angle=skew_angle
+    )
+    image_to_read = orient(thresh)
+    regions = select_text_regions(image_to_read) if text_regions else None
+    # Read with the default psm 4 config first, falling back to more lenient
+    # configs, or race them when OCR_STRATEGY_MODE is "race".
+    image_text: str = read_with_strategies(image, image_to_read, orient, regions)
 
     text_list: list = list(
         filter(lambda line: line != "" and len(line) > 1, image_text.split("."))
@@ -54,7 +72,89 @@ def process_image(image: cv2.typing.MatLike) -> list[str]:
     return text_list
 
 
-def determine_image_rotation(image: cv2.typing.MatLike) -> Optional[RotateFlags]:
+def get_ocr_config_fingerprint() -> str:
+    """Get a short hash of the settings that change the text read from an image.
+
+    OCR results are cached under it, so results read with other settings are not
+    served after a configuration change or a deploy.
+
+    Returns:
+        The first 12 hex digits of the SHA-256 digest of the settings.
+    """
+    settings = {
+        "version": OCR_PIPELINE_VERSION,
+        "max_long_side": OCR_MAX_LONG_SIDE,
+        "stages": list(PreprocessingPipeline.DEFAULT_STAGES),
+        "orientation_confidence": OCR_ORIENTATION_CONFIDENCE,
+        "strategies": OCR_STRATEGIES,
+        "strategy_mode": OCR_STRATEGY_MODE,
+        "text_regions": OCR_TEXT_REGIONS,
+        "backend": type(image_reader.ocr_backend).__name__,
+    }
+    encoded = json.dumps(settings, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+def find_orientation(
+    image: cv2.typing.MatLike, min_confidence: float = OCR_ORIENTATION_CONFIDENCE
+) -> tuple[RotateFlags | None, float]:
+    """Find the rotation and skew that make the text upright and level.
+
+    The cheap orientation estimate is used when it is confident, and the
+    Tesseract OSD pass is only run when it is not.
+
+    Args:
+        image: A binary image of the label.
+        min_confidence: The confidence the estimate needs to skip OSD.
+
+    Returns:
+        The rotation, and the skew angle in degrees to apply after it.
+    """
+    estimate = estimate_orientation(image)
+    skew_angle = estimate["skew_angle"]
+    method = "estimated" if estimate["confidence"] >= min_confidence else "osd"
+    orientation_stats[method] += 1
+    trace.get_current_span().set_attribute("orientation.method", method)
+    if method == "estimated":
+        cv2_rotation = estimate["rotation"]
+    else:
+        cv2_rotation = determine_image_rotation(image)
+        # The skew was measured along the estimated text lines, so it only
+        # holds if OSD agrees on whether the lines run across or down the image.
+        if is_quarter_turn(cv2_rotation) != is_quarter_turn(estimate["rotation"]):
+            skew_angle = 0.0
+    return cv2_rotation, skew_angle
+
+
+def apply_orientation(
+    image: cv2.typing.MatLike, cv2_rotation: RotateFlags | None, skew_angle: float
+) -> cv2.typing.MatLike:
+    """Rotate the image by the rotation and skew found by find_orientation.
+
+    Args:
+        image: An image to be rotated.
+        cv2_rotation: The rotation, if any.
+        skew_angle: The skew angle in degrees.
+
+    Returns:
+        The rotated image.
+    """
+    if cv2_rotation is not None:
+        image = rotate_image(image, cv2_rotation)
+    if abs(skew_angle) >= MIN_SKEW_ANGLE:
+        image = rotate_by_angle(image, skew_angle)
+    return image
+
+
+def is_quarter_turn(rotation: RotateFlags | None) -> bool:
+    """Check whether the rotation turns the image on its side."""
+    return rotation in (
+        RotateFlags.ROTATE_90_CLOCKWISE,
+        RotateFlags.ROTATE_90_COUNTERCLOCKWISE,
+    )
+
+
+def determine_image_rotation(image: cv2.typing.MatLike) -> RotateFlags | None:
     """Determine the rotation of the image.
     Args:
         image: An image to be processed.
@@ -64,7 +164,7 @@ def determine_image_rotation(image: cv2.typing.MatLike) -> Optional[RotateFlags]
 
     try:
         image_orientation = get_image_orientation(image)
-        cv2_rotation: Optional[RotateFlags]
+        cv2_rotation: RotateFlags | None
         match image_orientation["rotate"]:
             case 90:
                 cv2_rotation = RotateFlags.ROTATE_90_CLOCKWISE
@@ -3,11 +3,16 @@
 Reference: https://nanonets.com/blog/ocr-with-tesseract/
 """
 
-from enum import IntEnum
+import threading
+from collections.abc import Buffer
+from enum import IntEnum, StrEnum
+from functools import cache
 
 import cv2
 import numpy as np
 
+from ..metrics import stage_timer
+
 
 # I used an LLM to help me come up with the required cv2 functions needed to clean up the image for text processing
 class RotateFlags(IntEnum):
@@ -16,6 +21,112 @@ class RotateFlags(IntEnum):
     ROTATE_90_COUNTERCLOCKWISE = cv2.ROTATE_90_COUNTERCLOCKWISE
 
 
+# JPEG start of frame markers hold the image size. DHT, JPG and DAC share the range.
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def read_jpeg_size(image_bytes: Buffer) -> tuple[int, int] | None:
+    """Read the width and height from the JPEG header without decoding the image.
+
+    Args:
+        image_bytes: The encoded image.
+
+    Returns:
+        The width and height, or None if the bytes are not a JPEG image.
+    """
+    if image_bytes[:2] != b"\xff\xd8":
+        return None
+    position = 2
+    while position + 9 < len(image_bytes):
+        if image_bytes[position] != 0xFF:
+            return None
+        marker = image_bytes[position + 1]
+        if marker == 0xFF:
+            # Fill byte before the marker.
+            position += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height = int.from_bytes(image_bytes[position + 5 : position + 7], "big")
+            width = int.from_bytes(image_bytes[position + 7 : position + 9], "big")
+            return width, height
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            # Markers without a length field.
+            position += 2
+            continue
+        position += 2 + int.from_bytes(image_bytes[position + 2 : position + 4], "big")
+    return None
+
+
+@stage_timer("decode")
+def decode_image(image_bytes: Buffer, max_long_side: int = 0) -> cv2.typing.MatLike:
+    """Decode the image, using a reduced size JPEG decode when it is large.
+
+    The JPEG decoder can scale by 1/2, 1/4 or 1/8 while decoding, which is much
+    cheaper than decoding the full frame and resizing it. The largest reduction
+    that keeps the long side at or above the target is used.
+
+    Args:
+        image_bytes: The encoded image.
+        max_long_side: The target long side in pixels. 0 decodes at full size.
+
+    Returns:
+        The decoded BGR image, or None if the bytes cannot be decoded.
+    """
+    flag = cv2.IMREAD_COLOR
+    size = read_jpeg_size(image_bytes) if max_long_side else None
+    if size is not None:
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+            if max(size) // factor >= max_long_side:
+                flag = reduced_flag
+                break
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
+
+
+def downscale_to_long_side(
+    image: cv2.typing.MatLike, max_long_side: int
+) -> cv2.typing.MatLike:
+    """Shrink the image so its long side is at most the given size.
+
+    Phone photos of a label are mostly label, so the long side works as a proxy
+    for the text resolution. Around 2000 pixels keeps typical label text well above
+    the x-height tesseract needs.
+
+    Args:
+        image: The image to be processed.
+        max_long_side: The maximum long side in pixels. 0 leaves the image as is.
+
+    Returns:
+        cv2.typing.MatLike: The downscaled image, or the same image if it is small enough.
+    """
+    long_side = max(image.shape[:2])
+    if not max_long_side or long_side <= max_long_side:
+        return image
+    scale = max_long_side / long_side
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+@cache
+def get_kernel(size: int) -> np.ndarray:
+    """Get the square structuring element of the given size.
+
+    The kernel is created once and shared, so it must not be modified.
+
+    Args:
+        size: The kernel width and height.
+
+    Returns:
+        np.ndarray: A size x size kernel of ones.
+    """
+    kernel = np.ones((size, size), np.uint8)
+    kernel.flags.writeable = False
+    return kernel
+
+
 def get_grayscale(image: cv2.typing.MatLike) -> cv2.typing.MatLike:
     """Get the grayscale version of the image
 
@@ -62,8 +173,7 @@ def dilate(image: cv2.typing.MatLike) -> cv2.typing.MatLike:
 
     Returns:
         cv2.typing.MatLike: A dilated image."""
-    kernel = np.ones((5, 5), np.uint8)
-    return cv2.dilate(image, kernel, iterations=1)
+    return cv2.dilate(image, get_kernel(5), iterations=1)
 
 
 def erode(image: cv2.typing.MatLike) -> cv2.typing.MatLike:
@@ -74,8 +184,7 @@ def erode(image: cv2.typing.MatLike) -> cv2.typing.MatLike:
 
     Returns:
         cv2.typing.MatLike: An eroded image."""
-    kernel = np.ones((5, 5), np.uint8)
-    return cv2.erode(image, kernel, iterations=1)
+    return cv2.erode(image, get_kernel(5), iterations=1)
 
 
 # opening - erosion followed by dilation
@@ -87,8 +196,7 @@ def opening(image: cv2.typing.MatLike) -> cv2.typing.MatLike:
 
     Returns:
         cv2.typing.MatLike: An eroded and dilated image."""
-    kernel = np.ones((5, 5), np.uint8)
-    return cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel)
+    return cv2.morphologyEx(image, cv2.MORPH_OPEN, get_kernel(5))
 
 
 # canny edge detection
@@ -131,6 +239,18 @@ def deskew(image: cv2.typing.MatLike) -> cv2.typing.MatLike:
         angle = -(90 + angle)
     else:
         angle = -angle
+    return rotate_by_angle(image, angle)
+
+
+def rotate_by_angle(image: cv2.typing.MatLike, angle: float) -> cv2.typing.MatLike:
+    """Rotate the image about its centre by a small angle.
+
+    Args:
+        image: The image to be processed.
+        angle: The angle in degrees. Positive angles rotate anti-clockwise.
+
+    Returns:
+        cv2.typing.MatLike: A rotated image of the same size."""
     (h, w) = image.shape[:2]
     center = (w // 2, h // 2)
     m = cv2.getRotationMatrix2D(center, angle, 1.0)
@@ -154,3 +274,93 @@ def match_template(image: cv2.typing.MatLike, template: cv2.typing.MatLike):
     Returns:
         cv2.typing.MatLike: An image that has been matched to a template."""
     return cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+
+
+class PreprocessingStage(StrEnum):
+    """A step of the preprocessing pipeline."""
+
+    grayscale = "grayscale"
+    opening = "opening"
+    threshold = "threshold"
+    adaptive_threshold = "adaptive_threshold"
+
+
+class PreprocessingPipeline:
+    """Prepare an image for OCR with a fixed list of stages.
+
+    The image is converted to grayscale first so the later stages work on a single
+    channel. Each stage writes into one of two buffers that belong to the calling
+    worker thread and are reused across images, so no full size arrays are
+    allocated per image.
+
+    The returned image is one of the worker's buffers. It stays valid until the
+    same thread runs the pipeline again.
+
+    Args:
+        stages: The stages to run, in order.
+        kernel_size: The size of the structuring element used by the opening stage.
+    """
+
+    DEFAULT_STAGES = (
+        PreprocessingStage.grayscale,
+        PreprocessingStage.opening,
+        PreprocessingStage.threshold,
+    )
+
+    def __init__(
+        self,
+        stages: tuple[PreprocessingStage, ...] = DEFAULT_STAGES,
+        kernel_size: int = 5,
+    ):
+        self.stages = stages
+        self.kernel = get_kernel(kernel_size)
+        self._local = threading.local()
+
+    def _get_buffers(self, shape: tuple[int, int]) -> list[np.ndarray]:
+        # The flat buffers only grow, so portrait and landscape photos share them.
+        size = shape[0] * shape[1]
+        flat_buffers = getattr(self._local, "flat_buffers", None)
+        if flat_buffers is None or flat_buffers[0].size < size:
+            flat_buffers = [np.empty(size, np.uint8), np.empty(size, np.uint8)]
+            self._local.flat_buffers = flat_buffers
+        return [buffer[:size].reshape(shape) for buffer in flat_buffers]
+
+    @stage_timer("preprocess")
+    def run(self, image: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        """Run the stages on the image.
+
+        Args:
+            image: A BGR or grayscale image.
+
+        Returns:
+            cv2.typing.MatLike: The preprocessed grayscale image.
+        """
+        buffers = self._get_buffers(image.shape[:2])
+        current = image
+        for stage in self.stages:
+            dst = buffers[1] if current is buffers[0] else buffers[0]
+            match stage:
+                case PreprocessingStage.grayscale:
+                    if current.ndim == 2:
+                        continue
+                    current = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY, dst=dst)
+                case PreprocessingStage.opening:
+                    current = cv2.morphologyEx(
+                        current, cv2.MORPH_OPEN, self.kernel, dst=dst
+                    )
+                case PreprocessingStage.threshold:
+                    current = cv2.threshold(
+                        current, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst
+                    )[1]
+                case PreprocessingStage.adaptive_threshold:
+                    # Thresholds each neighbourhood, which copes with glare and shadow.
+                    current = cv2.adaptiveThreshold(
+                        current,
+                        255,
+                        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                        cv2.THRESH_BINARY,
+                        31,
+                        15,
+                        dst=dst,
+                    )
+        return current
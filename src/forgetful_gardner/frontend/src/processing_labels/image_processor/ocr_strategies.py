@@ -0,0 +1,258 @@
+"""Read a label with a list of OCR strategies, one after another or as a race.
+
+A strategy pairs a tesseract config with the preprocessing stages it reads. In
+sequential mode the strategies run in order until one passes the quality check,
+which is the original psm 4 then psm 1 fallback. In race mode they all start at
+once and the first read that passes the quality check wins.
+"""
+
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import StrEnum
+from functools import cache
+from typing import NamedTuple
+
+import cv2
+from opentelemetry import trace
+from pytesseract.pytesseract import TesseractError
+
+from ..metrics import strategy_reads, strategy_seconds
+from ..tracing import submit_in_context, tracer
+from .image_reader import TextReadQuality, analyse_image_data, get_image_data
+from .image_utils import PreprocessingPipeline, PreprocessingStage
+from .text_regions import TextRegion, get_text_regions_data
+
+
+class StrategyMode(StrEnum):
+    """How the strategies are run."""
+
+    sequential = "sequential"
+    race = "race"
+
+
+class OCRStrategy(NamedTuple):
+    """A tesseract config and the preprocessing stages of the image it reads."""
+
+    config: str
+    stages: tuple[PreprocessingStage, ...] = PreprocessingPipeline.DEFAULT_STAGES
+
+
+class StrategyResult(NamedTuple):
+    """The text read by a strategy and how well it was read."""
+
+    name: str
+    text: str
+    quality: TextReadQuality
+
+
+ADAPTIVE_STAGES = (
+    PreprocessingStage.grayscale,
+    PreprocessingStage.adaptive_threshold,
+)
+STRATEGIES = {
+    "psm4": OCRStrategy(r"--psm 4"),
+    "psm1": OCRStrategy(r"--psm 1"),
+    "psm6": OCRStrategy(r"--psm 6"),
+    "psm11": OCRStrategy(r"--psm 11"),
+    "psm4_adaptive": OCRStrategy(r"--psm 4", ADAPTIVE_STAGES),
+    "psm1_adaptive": OCRStrategy(r"--psm 1", ADAPTIVE_STAGES),
+}
+
+OCR_STRATEGY_MODE = StrategyMode(
+    os.getenv("OCR_STRATEGY_MODE", StrategyMode.sequential)
+)
+OCR_STRATEGIES = os.getenv("OCR_STRATEGIES", "psm4,psm1").split(",")
+if unknown := set(OCR_STRATEGIES) - STRATEGIES.keys():
+    raise ValueError(f"Unknown OCR strategies: {', '.join(sorted(unknown))}")
+# The race runs in its own threads. Borrowing the upload worker pool from inside
+# one of its own jobs could leave every worker waiting on queued strategies.
+strategy_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("OCR_STRATEGY_WORKERS", "4")),
+    thread_name_prefix="ocr-strategy",
+)
+
+
+class StrategyCancelledError(Exception):
+    """Raised inside a strategy when the race has already been decided."""
+
+
+@cache
+def get_pipeline(stages: tuple[PreprocessingStage, ...]) -> PreprocessingPipeline:
+    """Get the shared preprocessing pipeline for the stages."""
+    return PreprocessingPipeline(stages)
+
+
+def run_strategy(
+    name: str,
+    image: cv2.typing.MatLike,
+    default_image: cv2.typing.MatLike,
+    orient: Callable[[cv2.typing.MatLike], cv2.typing.MatLike],
+    regions: list[TextRegion] | None = None,
+    cancelled: threading.Event | None = None,
+) -> StrategyResult:
+    """Read the image with one strategy.
+
+    Args:
+        name: The strategy name.
+        image: The downscaled image before preprocessing.
+        default_image: The image already preprocessed with the default stages
+            and oriented, which is reused by strategies with the default stages.
+        orient: A function that applies the orientation found for the image.
+        regions: The text regions to read instead of the whole image.
+        cancelled: An event set when the result is no longer needed.
+
+    Returns:
+        The strategy result.
+
+    Raises:
+        StrategyCancelledError: If the race was decided before tesseract started.
+    """
+    strategy = STRATEGIES[name]
+    if strategy.stages == PreprocessingPipeline.DEFAULT_STAGES:
+        image_to_read = default_image
+    else:
+        image_to_read = orient(get_pipeline(strategy.stages).run(image))
+    if cancelled is not None and cancelled.is_set():
+        raise StrategyCancelledError(name)
+    with (
+        tracer.start_as_current_span(
+            "ocr_strategy",
+            attributes={"ocr.strategy": name, "ocr.config": strategy.config},
+        ) as span,
+        strategy_seconds.labels(strategy=name).time(),
+    ):
+        if regions:
+            image_data = get_text_regions_data(image_to_read, regions, strategy.config)
+        else:
+            image_data = get_image_data(image_to_read, config=strategy.config)
+        text, quality = analyse_image_data(image_data)
+        span.set_attributes(
+            {"ocr.good": quality["good"], "ocr.score": quality["score"]}
+        )
+    strategy_reads.labels(strategy=name, good=str(quality["good"]).lower()).inc()
+    return StrategyResult(name=name, text=text, quality=quality)
+
+
+def record_winner(name: str, names: list[str]) -> None:
+    """Record the strategy whose text is used on the current span.
+
+    Labels read by a fallback, such as psm 1, are marked so they can be found
+    among the slow traces.
+    """
+    trace.get_current_span().set_attributes(
+        {"ocr.strategy": name, "ocr.fallback": name != names[0]}
+    )
+
+
+def read_sequentially(
+    names: list[str],
+    image: cv2.typing.MatLike,
+    default_image: cv2.typing.MatLike,
+    orient: Callable[[cv2.typing.MatLike], cv2.typing.MatLike],
+    regions: list[TextRegion] | None = None,
+) -> str:
+    """Read the image with each strategy in turn until one passes the quality check.
+
+    Raises:
+        ValueError: If no strategy reads the image well enough.
+    """
+    for name in names:
+        result = run_strategy(name, image, default_image, orient, regions)
+        if result.quality["good"]:
+            record_winner(result.name, names)
+            return result.text
+    raise ValueError(
+        "Image text read quality is too low. Please check the image quality."
+    )
+
+
+def race_strategies(
+    names: list[str],
+    image: cv2.typing.MatLike,
+    default_image: cv2.typing.MatLike,
+    orient: Callable[[cv2.typing.MatLike], cv2.typing.MatLike],
+    regions: list[TextRegion] | None = None,
+) -> str:
+    """Read the image with all strategies at once.
+
+    The first result to pass the quality check wins. Strategies still queued are
+    cancelled and ones still preprocessing stop before tesseract starts. A
+    tesseract read that is already running finishes in the background and its
+    result is dropped. If no strategy passes, the best scoring text is used.
+
+    Raises:
+        ValueError: If no strategy reads any words confidently.
+    """
+    cancelled = threading.Event()
+    # The losers can still be reading after this returns, when the caller's
+    # pipeline buffer already holds the next image, so they read a copy.
+    default_image = default_image.copy()
+    pending: set[Future] = {
+        submit_in_context(
+            strategy_executor,
+            run_strategy,
+            name,
+            image,
+            default_image,
+            orient,
+            regions,
+            cancelled,
+        )
+        for name in names
+    }
+    best: StrategyResult | None = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except TesseractError:
+                    # One strategy failing to read leaves the others in the race.
+                    continue
+                if result.quality["good"]:
+                    record_winner(result.name, names)
+                    return result.text
+                if best is None or result.quality["score"] > best.quality["score"]:
+                    best = result
+    finally:
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+    if best is None or best.quality["score"] == 0:
+        raise ValueError(
+            "Image text read quality is too low. Please check the image quality."
+        )
+    record_winner(best.name, names)
+    return best.text
+
+
+def read_with_strategies(
+    image: cv2.typing.MatLike,
+    default_image: cv2.typing.MatLike,
+    orient: Callable[[cv2.typing.MatLike], cv2.typing.MatLike],
+    regions: list[TextRegion] | None = None,
+    names: list[str] = OCR_STRATEGIES,
+    mode: StrategyMode = OCR_STRATEGY_MODE,
+) -> str:
+    """Read the image text with the configured strategies.
+
+    Args:
+        image: The downscaled image before preprocessing.
+        default_image: The image preprocessed with the default stages and oriented.
+        orient: A function that applies the orientation found for the image.
+        regions: The text regions to read instead of the whole image.
+        names: The strategy names, in order of preference.
+        mode: Whether to run the strategies in turn or as a race.
+
+    Returns:
+        The image text.
+
+    Raises:
+        ValueError: If the image text cannot be read well enough.
+    """
+    if mode == StrategyMode.race and len(names) > 1:
+        return race_strategies(names, image, default_image, orient, regions)
+    return read_sequentially(names, image, default_image, orient, regions)
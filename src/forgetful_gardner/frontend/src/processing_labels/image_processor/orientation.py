@@ -0,0 +1,150 @@
+"""A fast orientation and skew estimate computed from projection profiles.
+
+Text lines show up as sharp peaks in the ink profile taken along the lines and as
+a flat profile across them, which tells horizontal text from vertical text. Latin
+text has more ascenders and capitals than descenders, so each line carries more
+ink above its x-height band than below it, which tells upright text from upside
+down text.
+"""
+
+from typing import TypedDict
+
+import cv2
+import numpy as np
+
+from ..metrics import stage_timer
+from .image_utils import RotateFlags, downscale_to_long_side, rotate_by_angle
+
+SKEW_ANGLES = np.arange(-10, 10.5, 1.0)
+
+
+class OrientationEstimate(TypedDict):
+    """The estimated rotation, skew and confidence."""
+
+    rotation: RotateFlags | None
+    skew_angle: float
+    confidence: float
+
+
+def get_ink(image: cv2.typing.MatLike, work_long_side: int) -> np.ndarray:
+    """Get a small float image with 1 for ink and 0 for background.
+
+    The ink is taken to be the minority of the pixels, so light text on a dark
+    label works as well as dark text on a light label.
+    """
+    small = downscale_to_long_side(image, work_long_side)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    ink = (small < 128).astype(np.float32)
+    if ink.mean() > 0.5:
+        ink = 1 - ink
+    return ink
+
+
+def row_profile(ink: np.ndarray) -> np.ndarray:
+    """Get the number of ink edges in each row.
+
+    Counting edges rather than ink keeps solid dark areas, such as the photo
+    around the label, from swamping the text lines.
+    """
+    return np.abs(np.diff(ink, axis=1)).sum(axis=1)
+
+
+def profile_sharpness(profile: np.ndarray) -> float:
+    """Get how strongly a profile is concentrated in a few peaks."""
+    mean = profile.mean()
+    return float(profile.var() / (mean * mean)) if mean else 0.0
+
+
+def find_skew(ink: np.ndarray) -> tuple[float, float]:
+    """Get the small rotation that makes the rows sharpest, and that sharpness.
+
+    Rather than rotating the image for every angle, the ink edges are sheared
+    by the angle and binned into rows, which is the same for small angles.
+    """
+    rows, columns = np.nonzero(np.diff(ink, axis=1))
+    if not len(rows):
+        return 0.0, 0.0
+    columns = columns - ink.shape[1] / 2
+    sharpness = []
+    for slope in np.tan(np.radians(SKEW_ANGLES)):
+        sheared = np.rint(rows - columns * slope).astype(np.intp)
+        sharpness.append(profile_sharpness(np.bincount(sheared - sheared.min())))
+    best = int(np.argmax(sharpness))
+    return float(SKEW_ANGLES[best]), sharpness[best]
+
+
+def ascender_score(ink: np.ndarray, min_lines: int = 3) -> tuple[float, int]:
+    """Compare the ink above and below the x-height band of each text line.
+
+    Args:
+        ink: The ink image with horizontal text lines.
+        min_lines: The number of lines needed for a score.
+
+    Returns:
+        A score between -1 and 1 that is positive for upright text, and the number
+        of lines found.
+    """
+    profile = row_profile(ink)
+    in_line = profile > 0.1 * profile.max() if profile.any() else profile > 0
+    padded = np.concatenate(([0], in_line.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    above = below = 0.0
+    lines = 0
+    for start, end in zip(edges[::2], edges[1::2]):
+        line = profile[start:end]
+        if len(line) < 4:
+            continue
+        core = np.flatnonzero(line >= 0.5 * line.max())
+        above += line[: core[0]].sum()
+        below += line[core[-1] + 1 :].sum()
+        lines += 1
+    if lines < min_lines or above + below == 0:
+        return 0.0, lines
+    return float((above - below) / (above + below)), lines
+
+
+@stage_timer("orientation")
+def estimate_orientation(
+    image: cv2.typing.MatLike, work_long_side: int = 1600
+) -> OrientationEstimate:
+    """Estimate the rotation needed to make the text upright and level.
+
+    The direction and skew of the lines are searched for at half the working
+    size, and the ascenders are compared at the full working size.
+
+    Args:
+        image: A binary or grayscale image of the label.
+        work_long_side: The long side in pixels the estimate works at.
+
+    Returns:
+        The rotation, the remaining skew angle in degrees to apply after it,
+        and a confidence between 0 and 1.
+    """
+    ink = get_ink(image, work_long_side)
+    small = cv2.resize(ink, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+    horizontal_skew, horizontal = find_skew(small)
+    # Rotating clockwise turns text that runs bottom to top into horizontal lines.
+    vertical_skew, vertical = find_skew(cv2.rotate(small, cv2.ROTATE_90_CLOCKWISE))
+    if horizontal >= vertical:
+        lines_ink = rotate_by_angle(ink, horizontal_skew)
+        skew_angle = horizontal_skew
+        upright, flipped = None, RotateFlags.ROTATE_180
+    else:
+        turned = cv2.rotate(ink, cv2.ROTATE_90_CLOCKWISE)
+        lines_ink = rotate_by_angle(turned, vertical_skew)
+        skew_angle = vertical_skew
+        upright = RotateFlags.ROTATE_90_CLOCKWISE
+        flipped = RotateFlags.ROTATE_90_COUNTERCLOCKWISE
+    sharpest = max(horizontal, vertical, 1e-6)
+    direction_confidence = 1 - min(horizontal, vertical) / sharpest
+    score, _ = ascender_score(lines_ink)
+    # Rotations about the centre commute, so the skew holds after either rotation.
+    rotation = flipped if score < 0 else upright
+    # A quarter of the line edges on one side is treated as a clear signal.
+    up_down_confidence = min(abs(score) / 0.25, 1.0)
+    return {
+        "rotation": rotation,
+        "skew_angle": skew_angle,
+        "confidence": round(min(direction_confidence, up_down_confidence), 3),
+    }
@@ -0,0 +1,163 @@
+"""Find the blocks of text on a label so OCR can skip the pots, leaves and background.
+
+The dark connected components of the binary image that are the size and shape of
+characters are kept. Leaves and pots make components that are too big or too solid
+to be characters. The characters are then grown into blocks, and blocks with only
+a few characters, which are usually specks in the background, are dropped.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from ..metrics import stage_timer
+from ..tracing import submit_in_context
+from .image_reader import IMAGE_DATA_KEYS, get_image_data
+from .image_utils import downscale_to_long_side
+
+
+class TextRegion(NamedTuple):
+    """A text block bounding box in pixels."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+# Region reads run in their own threads, since they can be started from a race
+# that is already running on the strategy threads.
+region_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("OCR_REGION_WORKERS", "4")),
+    thread_name_prefix="ocr-region",
+)
+
+
+@stage_timer("text_regions")
+def find_text_regions(
+    image: cv2.typing.MatLike,
+    work_long_side: int = 1000,
+    min_characters: int = 6,
+) -> list[TextRegion]:
+    """Find the text blocks in the image, in reading order.
+
+    Args:
+        image: A binary image with dark text, such as the preprocessing output.
+        work_long_side: The long side in pixels the search works at.
+        min_characters: The number of characters a block needs to be kept.
+
+    Returns:
+        The text block regions in the coordinates of the given image, sorted top
+        to bottom then left to right.
+    """
+    small = downscale_to_long_side(image, work_long_side)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    scale = image.shape[1] / small.shape[1]
+    ink = cv2.threshold(small, 127, 255, cv2.THRESH_BINARY_INV)[1]
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    x, y, width, height, area = stats[1:].T
+    fill = area / (width * height)
+    is_character = (
+        (height >= 4)
+        & (height <= small.shape[0] // 15)
+        & (width <= 4 * height)
+        & (fill >= 0.1)
+        & (fill <= 0.95)
+    )
+    if not is_character.any():
+        return []
+    characters = np.zeros_like(ink)
+    for cx, cy, cw, ch in zip(
+        x[is_character], y[is_character], width[is_character], height[is_character]
+    ):
+        characters[cy : cy + ch, cx : cx + cw] = 255
+    # Join the characters into words and lines, and the lines into blocks. The
+    # gaps between them scale with the font, so the kernel follows the text height.
+    text_height = int(np.median(height[is_character]))
+    blocks = cv2.dilate(
+        characters,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (3 * text_height, 2 * text_height)),
+    )
+    centres = centroids[1:][is_character].astype(np.intp)
+    block_labels = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+    characters_per_block = np.bincount(
+        block_labels[1][centres[:, 1], centres[:, 0]], minlength=block_labels[0]
+    )
+    regions = []
+    for label, (bx, by, bw, bh, _) in enumerate(block_labels[2]):
+        if label == 0 or characters_per_block[label] < min_characters:
+            continue
+        regions.append(
+            TextRegion(
+                int(bx * scale), int(by * scale), int(bw * scale), int(bh * scale)
+            )
+        )
+    return sorted(regions, key=lambda region: (region.y, region.x))
+
+
+def get_text_regions_data(
+    image: cv2.typing.MatLike, regions: list[TextRegion], config: str = r"--psm 4"
+) -> dict:
+    """Read each text region in parallel and merge the results.
+
+    The merged data keeps the image_to_data layout. Block numbers are offset so
+    each region keeps its own blocks, and word boxes are moved back into the
+    coordinates of the whole image.
+
+    Args:
+        image: The image the regions were found in.
+        regions: The text regions, in reading order.
+        config: The tesseract config used for each region.
+
+    Returns:
+        A dictionary in the pytesseract OutputDICT format.
+    """
+    crops = [
+        image[region.y : region.y + region.height, region.x : region.x + region.width]
+        for region in regions
+    ]
+    futures = [
+        submit_in_context(region_executor, get_image_data, crop, config)
+        for crop in crops
+    ]
+    merged: dict = {key: [] for key in IMAGE_DATA_KEYS}
+    block_offset = 0
+    for region, future in zip(regions, futures):
+        image_data = future.result()
+        block_nums = image_data["block_num"]
+        for key in IMAGE_DATA_KEYS:
+            values = image_data[key]
+            if key == "block_num":
+                values = [int(block_num) + block_offset for block_num in values]
+            elif key == "left":
+                values = [int(left) + region.x for left in values]
+            elif key == "top":
+                values = [int(top) + region.y for top in values]
+            merged[key].extend(values)
+        block_offset += max(map(int, block_nums), default=0)
+    return merged
+
+
+def select_text_regions(
+    image: cv2.typing.MatLike, max_coverage: float = 0.8
+) -> list[TextRegion] | None:
+    """Get the text regions worth cropping to.
+
+    Args:
+        image: A binary image with dark text, such as the preprocessing output.
+        max_coverage: The fraction of the image the regions may cover before the
+            whole image is read instead.
+
+    Returns:
+        The text regions, or None when the whole image should be read because no
+        text was found or the text fills most of it.
+    """
+    regions = find_text_regions(image)
+    covered = sum(region.width * region.height for region in regions)
+    if not regions or covered > max_coverage * image.shape[0] * image.shape[1]:
+        return None
+    return regions
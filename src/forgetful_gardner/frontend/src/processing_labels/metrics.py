@@ -0,0 +1,100 @@
+"""Prometheus metrics for the label reading pipeline.
+
+Each pipeline stage records its duration in one histogram, labelled by stage, with
+stage_timer. The counters the services already keep for /stats are exported as
+they are by a collector that reads them at scrape time.
+
+With OCR_POOL_KIND=process the OCR stages run in the worker processes, so their
+timings are not recorded by the process that serves /metrics.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from .tracing import tracer
+
+NAMESPACE = "forgetful_gardener"
+# From a few milliseconds for decoding up to a minute for a model call.
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+stage_seconds = Histogram(
+    "stage_seconds",
+    "Time spent in each pipeline stage.",
+    ["stage"],
+    namespace=NAMESPACE,
+    buckets=STAGE_BUCKETS,
+)
+strategy_seconds = Histogram(
+    "ocr_strategy_seconds",
+    "Time spent reading the label with each OCR strategy.",
+    ["strategy"],
+    namespace=NAMESPACE,
+    buckets=STAGE_BUCKETS,
+)
+strategy_reads = Counter(
+    "ocr_strategy_reads",
+    "OCR strategy reads, by whether they passed the quality check.",
+    ["strategy", "good"],
+    namespace=NAMESPACE,
+)
+in_progress = Gauge(
+    "in_progress",
+    "Requests currently in each stage.",
+    ["stage"],
+    namespace=NAMESPACE,
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time a pipeline stage, as a context manager or a decorator.
+
+    The stage also runs in a trace span of the same name.
+
+    Args:
+        stage: The stage name, used as the histogram label and the span name.
+    """
+    with tracer.start_as_current_span(stage), stage_seconds.labels(stage=stage).time():
+        yield
+
+
+class StatsCollector(Collector):
+    """Export a stats dictionary as Prometheus metrics at scrape time.
+
+    Args:
+        name: The metric name prefix for the stats.
+        get_stats: Returns the current stats.
+        counters: The stats that only ever increase. The others are gauges.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        get_stats: Callable[[], dict],
+        counters: Iterable[str] = (),
+    ):
+        self.name = name
+        self.get_stats = get_stats
+        self.counters = set(counters)
+
+    def collect(self):
+        for key, value in self.get_stats().items():
+            if not isinstance(value, (int, float)):
+                continue
+            metric_name = f"{NAMESPACE}_{self.name}_{key}"
+            documentation = f"The {key.replace('_', ' ')} of the {self.name}."
+            if key in self.counters:
+                yield CounterMetricFamily(metric_name, documentation, value=value)
+            else:
+                yield GaugeMetricFamily(metric_name, documentation, value=value)
+
+
+def register_stats(
+    name: str, get_stats: Callable[[], dict], counters: Iterable[str] = ()
+) -> None:
+    """Export the stats of a component in the default registry."""
+    REGISTRY.register(StatsCollector(name, get_stats, counters))
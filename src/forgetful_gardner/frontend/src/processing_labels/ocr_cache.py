@@ -0,0 +1,225 @@
+"""A content-addressed cache for OCR results.
+
+Results are keyed on a hash of the uploaded bytes and, optionally, on a perceptual
+hash of the decoded image so re-encoded copies of the same photo also hit. The keys
+are stored under a fingerprint of the OCR settings, so a result is only served to
+a service that would read the same text.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Buffer
+from pathlib import Path
+from typing import TypedDict
+
+import cv2
+import numpy as np
+
+
+class OCRCacheStats(TypedDict):
+    """The OCR cache hit and miss counters."""
+
+    memory_hits: int
+    disk_hits: int
+    perceptual_hits: int
+    misses: int
+    entries: int
+
+
+def image_cache_key(image_bytes: Buffer) -> str:
+    """Get the cache key for the raw image bytes.
+
+    Args:
+        image_bytes: The encoded image.
+
+    Returns:
+        A key built from the SHA-256 digest of the bytes.
+    """
+    return "sha256:" + hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_cache_key(image_bytes: Buffer) -> str | None:
+    """Get the cache key for the difference hash of the decoded image.
+
+    The image is decoded at an eighth of its size and shrunk to 9x8 pixels. Each bit
+    of the hash records whether a pixel is brighter than its right neighbour.
+
+    Args:
+        image_bytes: The encoded image.
+
+    Returns:
+        A key built from the 64 bit difference hash, or None if the image cannot be decoded.
+    """
+    image = cv2.imdecode(
+        np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8
+    )
+    if image is None:
+        return None
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return "dhash:" + np.packbits(bits).tobytes().hex()
+
+
+class OCRResultCache:
+    """An in-memory LRU cache of OCR results with an optional SQLite tier.
+
+    Args:
+        max_entries: The number of results kept in memory.
+        ttl: The number of seconds a result stays valid.
+        db_path: The SQLite database file for the on-disk tier. Disabled when None.
+        use_perceptual_hash: Whether to also key results on the image difference hash.
+        config: The fingerprint of the OCR settings. Stored results with another
+            fingerprint are never served, and are deleted from the on-disk tier.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 7 * 24 * 60 * 60,
+        db_path: Path | str | None = None,
+        use_perceptual_hash: bool = False,
+        config: str = "",
+    ):
+        self.max_entries = max_entries
+        self.config = config
+        self.ttl = ttl
+        self.use_perceptual_hash = use_perceptual_hash
+        self._entries: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results "
+                "(key TEXT PRIMARY KEY, text_list TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Results read with other settings can never be served again.
+            self._db.execute(
+                "DELETE FROM ocr_results WHERE substr(key, 1, ?) != ?",
+                (len(self._key_prefix), self._key_prefix),
+            )
+            self._db.commit()
+        self._stats: OCRCacheStats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "perceptual_hits": 0,
+            "misses": 0,
+            "entries": 0,
+        }
+
+    @classmethod
+    def from_env(cls, config: str = "") -> "OCRResultCache":
+        """Create a cache configured with environment variables.
+
+        Args:
+            config: The fingerprint of the OCR settings.
+        """
+        return cls(
+            config=config,
+            max_entries=int(os.getenv("OCR_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("OCR_CACHE_TTL", str(7 * 24 * 60 * 60))),
+            db_path=os.getenv("OCR_CACHE_DB") or None,
+            use_perceptual_hash=os.getenv("OCR_CACHE_PERCEPTUAL_HASH", "0") == "1",
+        )
+
+    @property
+    def _key_prefix(self) -> str:
+        return f"{self.config}/"
+
+    @property
+    def stats(self) -> OCRCacheStats:
+        """The cache hit and miss counters."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+    def get(self, keys: list[str], count_miss: bool = True) -> list[str] | None:
+        """Get the cached OCR result for the first key that is found.
+
+        Args:
+            keys: The cache keys of the image, most specific first.
+            count_miss: Whether a miss is counted. Set to False when another lookup
+                with more keys follows.
+
+        Returns:
+            The cached text list, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            for position, key in enumerate(keys):
+                key = self._key_prefix + key
+                text_list = self._get_from_memory(key, now)
+                tier = "memory_hits"
+                if text_list is None:
+                    text_list = self._get_from_disk(key, now)
+                    tier = "disk_hits"
+                if text_list is not None:
+                    self._stats["perceptual_hits" if position else tier] += 1
+                    return text_list
+            if count_miss:
+                self._stats["misses"] += 1
+            return None
+
+    def put(self, keys: list[str], text_list: list[str]) -> None:
+        """Store the OCR result under all of the image keys.
+
+        Args:
+            keys: The cache keys of the image.
+            text_list: The OCR result.
+        """
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                key = self._key_prefix + key
+                self._put_in_memory(key, text_list, now)
+                if self._db is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?)",
+                        (key, json.dumps(text_list), now),
+                    )
+            if self._db is not None:
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the on-disk tier."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _get_from_memory(self, key: str, now: float) -> list[str] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, text_list = entry
+        if now - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return text_list
+
+    def _get_from_disk(self, key: str, now: float) -> list[str] | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT text_list, created_at FROM ocr_results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        text_list, created_at = json.loads(row[0]), row[1]
+        if now - created_at > self.ttl:
+            self._db.execute("DELETE FROM ocr_results WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        # Promote to memory, keeping the original age so the TTL still applies.
+        self._put_in_memory(key, text_list, created_at)
+        return text_list
+
+    def _put_in_memory(self, key: str, text_list: list[str], created_at: float) -> None:
+        self._entries[key] = (created_at, text_list)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,118 @@
+"""A bounded worker pool for running the OCR pipeline off the event loop."""
+
+import asyncio
+import contextvars
+import mmap
+import os
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import StrEnum
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class PoolKind(StrEnum):
+    """The type of executor backing the pool."""
+
+    thread = "thread"
+    process = "process"
+
+
+class WorkerPoolFullError(RuntimeError):
+    """Raised when the worker pool queue is full."""
+
+
+class OCRWorkerPool:
+    """Run blocking OCR calls in an executor with a bounded queue.
+
+    Tesseract runs as a subprocess and OpenCV releases the GIL, so a thread pool
+    is enough to overlap uploads. A process pool can be used instead when the
+    python side of the pipeline becomes the bottleneck.
+
+    Args:
+        max_workers: The number of jobs that run at the same time.
+        max_queue_size: The number of jobs allowed to wait for a free worker.
+        kind: The type of executor to use.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue_size: int = 8,
+        kind: PoolKind = PoolKind.thread,
+    ):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.kind = kind
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    @classmethod
+    def from_env(cls) -> "OCRWorkerPool":
+        """Create a worker pool configured with environment variables."""
+        return cls(
+            max_workers=int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1))),
+            max_queue_size=int(os.getenv("OCR_QUEUE_SIZE", "8")),
+            kind=PoolKind(os.getenv("OCR_POOL_KIND", PoolKind.thread)),
+        )
+
+    @property
+    def pending(self) -> int:
+        """The number of running and queued jobs."""
+        return self._pending
+
+    def start(self) -> None:
+        """Start the executor."""
+        if self._executor is not None:
+            return
+        if self.kind == PoolKind.process:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="ocr"
+            )
+
+    def shutdown(self) -> None:
+        """Stop the executor, cancelling queued jobs."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Run the function in the pool.
+
+        Args:
+            func: A blocking function to run.
+            args: The arguments to pass to the function.
+
+        Returns:
+            The function result.
+
+        Raises:
+            WorkerPoolFullError: If the pool already has the maximum number of jobs.
+        """
+        if self._pending >= self.max_workers + self.max_queue_size:
+            raise WorkerPoolFullError(
+                "The server is busy processing other images. Please try again shortly."
+            )
+        self.start()
+        if self.kind == PoolKind.process:
+            # Arguments are pickled for the worker processes, which memory maps
+            # of uploads do not support.
+            args = tuple(
+                bytes(arg) if isinstance(arg, (mmap.mmap, memoryview)) else arg
+                for arg in args
+            )
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.kind == PoolKind.thread:
+                # Run in the caller's context, so the OCR spans join its trace.
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(
+                    self._executor, context.run, func, *args
+                )
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
@@ -0,0 +1,40 @@
+"""Helpers for reading and writing server-sent events."""
+
+from collections.abc import AsyncIterator
+
+import httpx
+
+
+def format_sse(event: str, data: str) -> str:
+    """Format a server-sent event.
+
+    Args:
+        event: The event name.
+        data: The event data. Each line is sent as its own data field.
+
+    Returns:
+        The event in the text/event-stream format.
+    """
+    data_lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {event}\n{data_lines}\n"
+
+
+async def iter_sse_events(response: httpx.Response) -> AsyncIterator[tuple[str, str]]:
+    """Read the server-sent events from a streamed response.
+
+    Args:
+        response: A streamed text/event-stream response.
+
+    Yields:
+        The event name and data of each event.
+    """
+    event, data_lines = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                yield event, "\n".join(data_lines)
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line.removeprefix("event:").strip()
+        elif line.startswith("data:"):
+            data_lines.append(line.removeprefix("data:").removeprefix(" "))
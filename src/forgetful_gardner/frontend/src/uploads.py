@@ -0,0 +1,74 @@
+"""Read uploaded photos without copying them into a new bytes object.
+
+Starlette spools each uploaded file to a SpooledTemporaryFile, which moves to a
+temporary file on disk once it is over 1 MB. A file on disk is memory mapped, so
+hashing and decoding read the spooled data in place instead of from a copy. Small
+uploads still held in memory are read as they are.
+"""
+
+import mmap
+
+from fastapi import UploadFile
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload is larger than the size limit."""
+
+
+def map_spooled_file(file: UploadFile) -> mmap.mmap | None:
+    """Memory map the upload's temporary file, if it has been spooled to disk.
+
+    The map stays readable after the upload is closed, so it can outlive the
+    request, for example in the job queue. It is unmapped when the last
+    reference to it goes.
+
+    Args:
+        file: The uploaded file.
+
+    Returns:
+        A read-only map of the file, or None if the upload is in memory or empty.
+    """
+    # Checked the way Starlette does, as fileno() would move an in-memory file
+    # to disk.
+    if not getattr(file.file, "_rolled", True):
+        return None
+    try:
+        file.file.flush()
+        return mmap.mmap(file.file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # An empty file cannot be mapped, and some file objects have no fileno.
+        return None
+
+
+async def read_upload(
+    file: UploadFile, max_bytes: int, chunk_size: int = 1024 * 1024
+) -> bytes | mmap.mmap:
+    """Get the uploaded photo, mapping it in place when it is on disk.
+
+    Args:
+        file: The uploaded file.
+        max_bytes: The largest file size allowed.
+        chunk_size: The size of the reads for an upload that cannot be mapped.
+
+    Returns:
+        The photo data.
+
+    Raises:
+        UploadTooLargeError: If the file is larger than max_bytes.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(file.filename)
+    mapped = map_spooled_file(file)
+    if mapped is not None:
+        if len(mapped) > max_bytes:
+            raise UploadTooLargeError(file.filename)
+        return mapped
+    # Read in chunks so a file without a known size stops at the limit.
+    chunks, size = [], 0
+    await file.seek(0)
+    while chunk := await file.read(chunk_size):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(file.filename)
+        chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
@@ -0,0 +1,55 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parents[1] / "src/forgetful_gardner/frontend/src")
+)
+
+from calendar_invite import build_ics, escape_ics_text, fold_ics_line
+
+
+def unfold(text: str) -> str:
+    return text.replace("\r\n ", "")
+
+
+def test_long_line_is_folded_without_splitting_characters():
+    line = "DESCRIPTION:" + "Gießen im Frühling 🌸 und Düngen im Herbst, " * 6
+    folded = fold_ics_line(line)
+    parts = folded.split("\r\n")
+    assert len(parts) > 1
+    assert all(len(part.encode("utf-8")) <= 75 for part in parts)
+    assert all(part.startswith(" ") for part in parts[1:])
+    assert unfold(folded) == line
+
+
+def test_short_line_is_not_folded():
+    line = "SUMMARY:" + "é" * 33
+    assert len(line.encode("utf-8")) == 74
+    assert fold_ics_line(line) == line
+
+
+def test_special_characters_are_escaped():
+    assert escape_ics_text("Water; then feed, weekly\\monthly") == (
+        "Water\\; then feed\\, weekly\\\\monthly"
+    )
+    assert escape_ics_text("Sun\nShade\r\nFrost") == "Sun\\nShade\\nFrost"
+
+
+def test_calendar_description_reads_back_after_unfolding():
+    calendar = build_ics(
+        "Sutera cordata",
+        "Fortnightly",
+        ["Spring", "Autumn"],
+        image_text="Position: Full sun; part shade\nWatering: moist " * 4,
+        start_date=date(2026, 10, 21),
+    )
+    lines = unfold(calendar).split("\r\n")
+    assert all(len(line.encode("utf-8")) <= 75 for line in calendar.split("\r\n"))
+    assert "DTSTART;VALUE=DATE:20261021" in lines
+    assert "RRULE:FREQ=WEEKLY;INTERVAL=2;WKST=MO;BYDAY=WE" in lines
+    description = next(line for line in lines if line.startswith("DESCRIPTION:"))
+    assert description.startswith(
+        "DESCRIPTION:Fertilise your Sutera cordata plant as per schedule: "
+        "Spring\\, Autumn.\\nPosition: Full sun\\; part shade\\n"
+    )
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from forgetful_gardner.cli import (
+    end_partial_line,
+    load_finished,
+    process_image,
+    write_parquet,
+)
+
+CARE = {"watering_frequency": "Weekly", "name": "Lavandula stoechas"}
+
+
+def make_record(image: str, **fields) -> dict:
+    record = {
+        "image": image,
+        "ocr_text": None,
+        "care": None,
+        "error": None,
+        "ocr_seconds": 1.0,
+        "extract_seconds": 0.0,
+    }
+    record.update(fields)
+    return record
+
+
+@pytest.fixture
+def output(tmp_path: Path) -> Path:
+    """A batch output file cut short in the middle of its last line."""
+    records = [
+        make_record("extracted.jpg", ocr_text="Lavandula", care=CARE),
+        make_record("read.jpg", ocr_text="Salvia"),
+        make_record("unreadable.jpg", error="Could not read the label text."),
+        make_record("not_extracted.jpg", ocr_text="Sutera", error="Extraction failed"),
+        make_record("retried.jpg", error="OCR failed: timeout"),
+        make_record("retried.jpg", ocr_text="Dahlia", care=CARE),
+    ]
+    path = tmp_path / "plant_care.jsonl"
+    lines = [json.dumps(record) + "\n" for record in records]
+    path.write_text("".join(lines) + lines[0][:20], encoding="utf-8")
+    return path
+
+
+def test_missing_output_has_nothing_finished(tmp_path):
+    assert load_finished(tmp_path / "missing.jsonl", False, False) == (set(), {})
+
+
+def test_failed_images_are_finished_unless_retried(output):
+    finished, read_texts = load_finished(output, retry_failed=False, ocr_only=False)
+    assert finished == {
+        "extracted.jpg",
+        "unreadable.jpg",
+        "not_extracted.jpg",
+        "retried.jpg",
+    }
+    assert read_texts == {"read.jpg": "Salvia"}
+
+    finished, read_texts = load_finished(output, retry_failed=True, ocr_only=False)
+    assert finished == {"extracted.jpg", "retried.jpg"}
+    assert read_texts == {"read.jpg": "Salvia", "not_extracted.jpg": "Sutera"}
+
+
+def test_read_images_are_finished_for_an_ocr_only_run(output):
+    finished, read_texts = load_finished(output, retry_failed=False, ocr_only=True)
+    assert finished == {
+        "extracted.jpg",
+        "read.jpg",
+        "unreadable.jpg",
+        "not_extracted.jpg",
+        "retried.jpg",
+    }
+    assert read_texts == {}
+
+
+def test_partial_line_is_ended(output):
+    end_partial_line(output)
+    content = output.read_bytes()
+    assert content.endswith(b"\n")
+    end_partial_line(output)
+    assert output.read_bytes() == content
+    # The cut line is skipped and the next record is read.
+    with output.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(make_record("new.jpg", ocr_text="Hebe", care=CARE)) + "\n")
+    assert "new.jpg" in load_finished(output, False, False)[0]
+
+
+def test_empty_output_is_left_alone(tmp_path):
+    path = tmp_path / "plant_care.jsonl"
+    path.touch()
+    end_partial_line(path)
+    assert path.read_bytes() == b""
+
+
+def test_parquet_keeps_the_last_record_of_each_image(output, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    parquet_path = tmp_path / "plant_care.parquet"
+    write_parquet(output, parquet_path)
+    rows = {row["image"]: row for row in pq.read_table(parquet_path).to_pylist()}
+    assert len(rows) == 5
+    assert rows["retried.jpg"]["error"] is None
+    assert json.loads(rows["retried.jpg"]["care"]) == CARE
+    assert rows["read.jpg"]["care"] is None
+
+
+def test_read_label_text_is_not_read_again():
+    requests = []
+
+    def extract(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json=CARE)
+
+    async def process() -> dict:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(extract)) as client:
+            # No OCR pool, so reading the photo would fail.
+            return await process_image(
+                Path("read.jpg"),
+                None,
+                client,
+                "http://backend/extract",
+                asyncio.Semaphore(1),
+                ocr_text="Salvia",
+            )
+
+    record = asyncio.run(process())
+    assert requests == [{"ocr_text": "Salvia"}]
+    assert record["ocr_text"] == "Salvia"
+    assert record["care"] == CARE
+    assert record["error"] is None
+    assert record["ocr_seconds"] == 0.0
+
+
+def test_response_that_is_not_json_is_recorded():
+    def extract(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text="<html>Bad gateway</html>")
+
+    async def process() -> dict:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(extract)) as client:
+            return await process_image(
+                Path("read.jpg"),
+                None,
+                client,
+                "http://backend/extract",
+                asyncio.Semaphore(1),
+                ocr_text="Salvia",
+            )
+
+    record = asyncio.run(process())
+    assert record["care"] is None
+    assert record["error"].startswith("Extraction failed")
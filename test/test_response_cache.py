@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parents[1] / "src/forgetful_gardner/backend/src")
+)
+
+import main
+from plant_care.models import CareFrequency, PlantCareModel
+from plant_care.response_cache import ResponseCache
+
+
+def test_reading_differences_share_a_key():
+    key = ResponseCache.make_key("Lavandula stoechas\nWater weekly!", "llama")
+    assert key == ResponseCache.make_key(
+        "  lavandula  STOECHAS, water weekly ", "llama"
+    )
+    assert key == ResponseCache.make_key("Lavandula stoechas | Water weekly", "llama")
+    assert key != ResponseCache.make_key("Lavandula stoechas water monthly", "llama")
+    assert key != ResponseCache.make_key("Lavandula stoechas water weekly", "gemma")
+
+
+def test_expired_response_is_a_miss(monkeypatch):
+    cache = ResponseCache(ttl=60)
+    now = 1000.0
+    monkeypatch.setattr("plant_care.response_cache.time.time", lambda: now)
+    cache.put("key", "response", duration=2.0)
+    now += 59
+    assert cache.get("key") == "response"
+    now += 2
+    assert cache.get("key") is None
+    assert cache.stats["entries"] == 0
+    assert (cache.stats["hits"], cache.stats["misses"]) == (1, 1)
+
+
+def test_least_recently_used_response_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "first", duration=1.0)
+    cache.put("b", "second", duration=1.0)
+    assert cache.get("a") == "first"
+    cache.put("c", "third", duration=1.0)
+    assert cache.get("b") is None
+    assert cache.get("a") == "first"
+    assert cache.get("c") == "third"
+
+
+def test_expired_response_is_removed_from_the_store(tmp_path):
+    cache = ResponseCache(ttl=0, db_path=tmp_path / "responses.db")
+    cache.put("key", "response", duration=1.0)
+    assert cache.get("key") is None
+    cache.close()
+    reopened = ResponseCache(db_path=tmp_path / "responses.db")
+    assert reopened.get("key") is None
+    reopened.close()
+
+
+def test_only_interpreted_responses_are_cached(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(main, "response_cache", cache)
+    results = {
+        "unread": PlantCareModel(name="Lavandula stoechas"),
+        "read": PlantCareModel(
+            name="Lavandula stoechas", watering_frequency=CareFrequency.weekly
+        ),
+    }
+
+    async def invoke_ollama_model(ocr_text: str) -> PlantCareModel:
+        return results[ocr_text.strip('"')]
+
+    monkeypatch.setattr(main, "invoke_ollama_model", invoke_ollama_model)
+    asyncio.run(main.invoke_and_cache("unread-key", "unread"))
+    asyncio.run(main.invoke_and_cache("read-key", "read"))
+    assert cache.get("unread-key") is None
+    assert cache.get("read-key") == results["read"].model_dump_json()
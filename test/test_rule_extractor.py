@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parents[1] / "src/forgetful_gardner/backend/src")
+)
+
+from plant_care.models import CareFrequency, FertiliserFrequency
+from plant_care.rule_extractor import (
+    RuleExtractor,
+    find_fertiliser,
+    find_name,
+    find_watering_frequency,
+)
+
+
+def test_resolves_a_clear_label():
+    plant_care = RuleExtractor().resolve(
+        "Lavandula stoechas\nWatering: water regularly\nFertilise in spring"
+    )
+    assert plant_care is not None
+    assert plant_care.name == "Lavandula stoechas"
+    assert plant_care.watering_frequency == CareFrequency.weekly
+    assert plant_care.fertiliser == [FertiliserFrequency.spring]
+
+
+def test_instruction_is_not_a_name():
+    ocr_text = "Keep away from frost\nWatering: Keep soil moist"
+    assert find_name(ocr_text.splitlines()) == ("", 0.0)
+    assert RuleExtractor().resolve(ocr_text) is None
+
+
+def test_skips_instruction_before_the_name():
+    lines = [
+        "Remove plant from container",
+        "Lavandula stoechas",
+        "Watering: water regularly",
+    ]
+    assert find_name(lines) == ("Lavandula stoechas", 1.0)
+
+
+def test_name_far_down_the_label_is_less_certain():
+    lines = ["Full sun", "Hardy", "Evergreen", "Lavandula stoechas"]
+    name, confidence = find_name(lines)
+    assert name == "Lavandula stoechas"
+    assert confidence < 1.0
+
+
+def test_several_watering_frequencies_fall_back_to_the_model():
+    ocr_text = "Lavandula stoechas\nWater weekly in summer, monthly in winter"
+    frequency, confidence = find_watering_frequency(ocr_text.splitlines())
+    assert frequency == CareFrequency.weekly
+    assert confidence < 0.5
+    assert RuleExtractor().resolve(ocr_text) is None
+
+
+def test_no_fertiliser_is_an_empty_list():
+    assert find_fertiliser(["Lavandula stoechas", "Water weekly"]) == ([], 1.0)
+    plant_care = RuleExtractor().resolve("Lavandula stoechas\nWater weekly")
+    assert plant_care is not None
+    assert plant_care.fertiliser == []
+
+
+def test_wrapped_fertiliser_line_is_read():
+    lines = ["Fertilise with slow release", "pellets in spring and autumn"]
+    assert find_fertiliser(lines) == (
+        [FertiliserFrequency.spring, FertiliserFrequency.autumn],
+        1.0,
+    )
+
+
+def test_watering_line_after_fertiliser_is_not_read_as_fertiliser():
+    plant_care = RuleExtractor().resolve(
+        "Lavandula stoechas\nFertilise in spring\nWatering: water weekly"
+    )
+    assert plant_care is not None
+    assert plant_care.fertiliser == [FertiliserFrequency.spring]
+    assert plant_care.watering_frequency == CareFrequency.weekly
+
+    plant_care = RuleExtractor().resolve(
+        "Salvia nemorosa\nFeed monthly\nWatering: keep moist in summer"
+    )
+    assert plant_care is not None
+    assert plant_care.fertiliser == [FertiliserFrequency.monthly]
+    assert plant_care.watering_frequency == CareFrequency.weekly
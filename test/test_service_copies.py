@@ -0,0 +1,32 @@
+import ast
+from pathlib import Path
+
+SERVICES = Path(__file__).resolve().parents[1] / "src/forgetful_gardner"
+
+
+def get_functions(path: Path) -> dict[str, str]:
+    """Get the code of each top-level function of a module, without docstrings.
+
+    The docstrings may differ, for example to name each service's own variables.
+    """
+    functions = {}
+    for node in ast.parse(path.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef):
+            if ast.get_docstring(node) is not None:
+                node.body = node.body[1:]
+            functions[node.name] = ast.dump(node)
+    return functions
+
+
+def test_http_clients_are_the_same():
+    frontend = get_functions(SERVICES / "frontend/src/http_client.py")
+    backend = get_functions(SERVICES / "backend/src/plant_care/http_client.py")
+    assert frontend == backend
+
+
+def test_tracing_functions_are_the_same():
+    frontend = get_functions(SERVICES / "frontend/src/processing_labels/tracing.py")
+    backend = get_functions(SERVICES / "backend/src/plant_care/tracing.py")
+    # Only the frontend has thread pools to carry the trace context into.
+    assert frontend.keys() - backend.keys() == {"submit_in_context"}
+    assert all(frontend[name] == backend[name] for name in backend)
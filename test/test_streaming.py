@@ -0,0 +1,70 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+SERVICES = Path(__file__).resolve().parents[1] / "src/forgetful_gardner"
+sys.path.insert(0, str(SERVICES / "frontend/src"))
+sys.path.insert(0, str(SERVICES / "backend/src"))
+
+from plant_care.streaming import PartialJSONObjectParser, format_sse
+from sse import iter_sse_events
+
+DOCUMENT = (
+    '{"watering_frequency": "Weekly", '
+    '"name": "Sutera \\"Snowstorm\\" cordata \\u00e9\\\\", '
+    '"fertiliser": ["Spring", "Autumn"], "height": 120, "hardy": true, '
+    '"notes": {"sun": null}}'
+)
+FIELDS = list(json.loads(DOCUMENT).items())
+
+
+@pytest.mark.parametrize("offset", range(len(DOCUMENT) + 1))
+def test_document_split_at_any_offset_gives_each_field_once(offset):
+    parser = PartialJSONObjectParser()
+    fields = parser.feed(DOCUMENT[:offset])
+    # Only complete fields are emitted, so the start is a prefix of the fields.
+    assert fields == FIELDS[: len(fields)]
+    fields += parser.feed(DOCUMENT[offset:])
+    assert fields == FIELDS
+
+
+def test_document_fed_a_character_at_a_time():
+    parser = PartialJSONObjectParser()
+    fields = []
+    for character in DOCUMENT:
+        fields += parser.feed(character)
+    assert fields == FIELDS
+
+
+def test_number_waits_for_its_last_digit():
+    parser = PartialJSONObjectParser()
+    assert parser.feed('{"height": 12') == []
+    assert parser.feed("0, ") == [("height", 120)]
+
+
+def test_text_that_is_not_an_object_is_an_error():
+    with pytest.raises(ValueError):
+        PartialJSONObjectParser().feed('["Weekly"]')
+
+
+def test_multi_line_data_is_sent_as_several_data_lines():
+    assert format_sse("result", "<p>Sutera</p>\n<p>Weekly</p>") == (
+        "event: result\ndata: <p>Sutera</p>\ndata: <p>Weekly</p>\n\n"
+    )
+    assert format_sse("done", "") == "event: done\ndata: \n\n"
+
+
+def test_framed_events_are_read_back():
+    events = [("field", "<p>Sutera</p>\n<p>Weekly</p>"), ("done", "{}")]
+    response = httpx.Response(
+        200, content="".join(format_sse(event, data) for event, data in events)
+    )
+
+    async def read_events() -> list[tuple[str, str]]:
+        return [event async for event in iter_sse_events(response)]
+
+    assert asyncio.run(read_events()) == events